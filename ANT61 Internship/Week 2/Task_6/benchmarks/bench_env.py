@@ -0,0 +1,97 @@
+"""Construction time, step/reset rate and render rate of FrozenLakeEnv, bare and
+through the gym.make wrapper stack, run from Task_6 with
+
+    python -m benchmarks.bench_env --sizes 8 16 32
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+# the human render mode needs a display, a dummy one is enough to time it
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import gym
+
+import custom_frozen_lake  # noqa: F401, registers CustomFrozenLake
+from custom_frozen_lake.envs import FrozenLakeEnv
+from custom_frozen_lake.envs.custom_frozen_lake_env import generate_random_map
+
+SIZES = [8, 16, 32]
+RENDER_MODES = ["rgb_array", "ansi", "human"]
+
+
+def per_sec(fn, budget):
+    """Calls fn until budget seconds have passed, returns calls per second"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return count / elapsed
+
+
+def steps_per_sec(env, budget, seed=0):
+    """Random-action steps per second, resetting (on the same map) whenever an episode ends"""
+    env.reset(seed=seed)
+    actions = np.random.default_rng(seed).integers(4, size=1 << 16)
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for a in actions[:1024]:
+            if env.step(int(a))[2]:
+                env.reset()
+        count += 1024
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return count / elapsed
+
+
+def run(sizes=SIZES, p=0.8, budget=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        desc = generate_random_map(size, p, seed=rng)
+        bare = FrozenLakeEnv(desc=desc)
+        wrapped = gym.make("CustomFrozenLake", desc=desc)
+        row = {"size": size, "p": p}
+        # construction with a given map, and with the map generated in __init__ as set_up does
+        row["init_desc_ms"] = 1000 / per_sec(lambda: FrozenLakeEnv(desc=desc), budget)
+        row["init_random_ms"] = 1000 / per_sec(lambda: FrozenLakeEnv(map_size=size, frozen_p=p), budget)
+        row["step_per_sec"] = steps_per_sec(bare, budget, seed)
+        row["step_wrapped_per_sec"] = steps_per_sec(wrapped, budget, seed)
+        row["reset_per_sec"] = per_sec(bare.reset, budget)
+        # reset onto a new lake, as train_model does every episode (map generation not included)
+        row["reset_new_map_per_sec"] = per_sec(lambda: bare.reset(options={"desc": desc}), budget)
+        bare.reset(seed=seed)
+        bare.step(1)
+        # human mode waits for render_fps frames per second, time the drawing only
+        bare.metadata = dict(bare.metadata, render_fps=0)
+        for mode in RENDER_MODES:
+            row[f"render_{mode}_fps"] = per_sec(lambda: bare.render(mode=mode), budget)
+        bare.close()
+        wrapped.close()
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--p", type=float, default=0.8, help="probability that a tile is frozen")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per measurement")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.p, args.budget)
+    columns = [key for key in results[0] if key not in ("size", "p")]
+    print(f"{'size':>6} " + " ".join(f"{c:>22}" for c in columns))
+    for row in results:
+        print(f"{row['size']:>6} " + " ".join(f"{row[c]:>22.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Import time of the custom_frozen_lake modules in a fresh interpreter, and
+whether they pulled in pygame (which is now only imported on the first render),
+run from Task_6 with
+
+    python -m benchmarks.bench_import --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+MODULES = ["custom_frozen_lake", "custom_frozen_lake.envs", "custom_frozen_lake.sweep"]
+
+# times one import and reports whether pygame came with it
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "pygame": "pygame" in sys.modules}}))
+"""
+
+
+def import_time(module, repeat=5):
+    """Median seconds taken by `import module` in new interpreters, and whether pygame was loaded"""
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            capture_output=True, text=True, check=True, env=env,
+        ).stdout
+        # the probe's json is the last line, pygame may print its banner first
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return float(np.median([r["seconds"] for r in runs])), runs[-1]["pygame"]
+
+
+def run(modules=MODULES, repeat=5):
+    results = []
+    # what every module paid on top of its own imports while pygame was imported eagerly
+    pygame_seconds, _ = import_time("pygame", repeat)
+    for module in modules:
+        seconds, loaded = import_time(module, repeat)
+        results.append({"module": module, "seconds": seconds, "pygame": loaded,
+                        "pygame_seconds": pygame_seconds})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    args = parser.parse_args()
+
+    results = run(args.modules, args.repeat)
+    print(f"{'module':<28} {'import ms':>10} {'pygame':>7}   eager pygame import: "
+          f"{results[0]['pygame_seconds'] * 1000:.0f} ms")
+    for row in results:
+        print(f"{row['module']:<28} {row['seconds'] * 1000:>10.0f} {str(row['pygame']):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Maps/sec of generate_random_map (DFS rejection sampling) against the
+vectorised generate_random_maps ("flood" and "carve"), run from Task_6 with
+
+    python -m benchmarks.bench_map_generation --p 0.6 0.8 0.9
+"""
+import argparse
+import time
+
+import numpy as np
+
+from custom_frozen_lake.envs.custom_frozen_lake_env import generate_random_map
+from custom_frozen_lake.envs.map_generation import generate_random_maps
+
+SIZES = [8, 16, 32, 64, 128, 256]
+PS = [0.8]
+
+
+def maps_per_sec(fn, budget):
+    """Calls fn (which returns the number of maps it made) until budget seconds have passed"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        count += fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return count / elapsed
+
+
+def run(sizes=SIZES, ps=PS, budget=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    results = []
+    for p in ps:
+        for size in sizes:
+            # keep the vectorised batches to a few million cells
+            batch = max(1, min(4096, (1 << 22) // (size * size)))
+            row = {"size": size, "p": p}
+            row["dfs"] = maps_per_sec(lambda: generate_random_map(size, p, seed=rng) and 1, budget)
+            for method in ("flood", "carve"):
+                row[method] = maps_per_sec(
+                    lambda: len(generate_random_maps(batch, size, p, method=method, seed=rng)),
+                    budget,
+                )
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--p", type=float, nargs="+", default=PS, help="probabilities that a tile is frozen")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per measurement")
+    args = parser.parse_args()
+
+    print(f"{'p':>5} {'size':>6} {'dfs':>12} {'flood':>12} {'carve':>12}   maps/sec")
+    for row in run(args.sizes, args.p, args.budget):
+        print(
+            f"{row['p']:>5} {row['size']:>6} {row['dfs']:>12.1f} {row['flood']:>12.1f} {row['carve']:>12.1f}"
+            f"   flood x{row['flood'] / row['dfs']:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
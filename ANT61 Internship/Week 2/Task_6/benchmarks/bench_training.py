@@ -0,0 +1,87 @@
+"""End-to-end training throughput in episodes per second: the per-episode
+train_model loop of run_frozen_lake.ipynb (on a gym.make env, a fresh random
+map per episode) against train_q_learning on VectorFrozenLakeEnv, run from
+Task_6 with
+
+    python -m benchmarks.bench_training --episodes 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import gym
+
+import custom_frozen_lake  # noqa: F401, registers CustomFrozenLake
+from custom_frozen_lake.envs import VectorFrozenLakeEnv
+from custom_frozen_lake.envs.custom_frozen_lake_env import generate_random_map
+from custom_frozen_lake.exploration import GREEDY, ExplorationSchedule
+from custom_frozen_lake.rng import seed_sequence
+from custom_frozen_lake.training import train_q_learning
+
+NUM_ENVS = [1, 256, 1024]
+HYPERPARAMS = {"learning_rate": 0.1, "gamma": 0.6667, "max_steps": 200, "decay_rate": 1e-4}
+
+
+def train_model_loop(env, qtable, total_episodes, frozen_p, learning_rate, gamma, max_steps, decay_rate,
+                     max_epsilon=1.0, min_epsilon=0.0, profiler=None, seed=0):
+    """The training loop of train_model without rendering, printing or metrics"""
+    new_map = generate_random_map if profiler is None else profiler.timed(generate_random_map)
+    maps_seed, env_seed, explore_seed = seed_sequence(seed).spawn(3)
+    maps_rng = np.random.default_rng(maps_seed)
+    schedule = ExplorationSchedule(total_episodes, max_steps, env.action_space.n, 1.0, max_epsilon, min_epsilon,
+                                   decay_rate, seed=explore_seed)
+    for episode in range(total_episodes):
+        if episode > 0: state = env.reset(options={"desc": new_map(size=env.nrow, p=frozen_p, seed=maps_rng)})
+        else: state = env.reset(seed=env_seed, options={"desc": new_map(size=env.nrow, p=frozen_p, seed=maps_rng)})
+        actions = schedule.actions(episode)
+        for step in range(max_steps):
+            action = actions[step]
+            if action == GREEDY: action = np.argmax(qtable[state])
+            new_state, reward, done, info = env.step(action)
+            qtable[state + (action,)] += learning_rate * (reward + gamma * np.max(qtable[new_state]) - qtable[state + (action,)])
+            state = new_state
+            if done: break
+    return qtable
+
+
+def run(episodes=2000, num_envs=NUM_ENVS, size=8, p=0.8, seed=0):
+    results = []
+
+    env = gym.make("CustomFrozenLake", map_size=size, frozen_p=p, seed=seed)
+    start = time.perf_counter()
+    train_model_loop(env, np.zeros((16, 4, 4)), episodes, p, seed=seed, **HYPERPARAMS)
+    elapsed = time.perf_counter() - start
+    env.close()
+    results.append({"trainer": "train_model", "num_envs": 1, "size": size, "p": p,
+                    "episodes": episodes, "seconds": elapsed, "episodes_per_sec": episodes / elapsed})
+
+    for n in num_envs:
+        vec = VectorFrozenLakeEnv(num_envs=n, map_size=size, frozen_p=p, seed=seed)
+        # enough episodes for every lane to play a few
+        total = max(episodes, 8 * n)
+        start = time.perf_counter()
+        train_q_learning(vec, np.zeros((16, 4, 4)), total, frozen_p=p, seed=seed, **HYPERPARAMS)
+        elapsed = time.perf_counter() - start
+        results.append({"trainer": "train_q_learning", "num_envs": n, "size": size, "p": p,
+                        "episodes": total, "seconds": elapsed, "episodes_per_sec": total / elapsed})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--episodes", type=int, default=2000, help="episodes of the train_model loop")
+    parser.add_argument("--num-envs", type=int, nargs="+", default=NUM_ENVS)
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--p", type=float, default=0.8, help="probability that a tile is frozen")
+    args = parser.parse_args()
+
+    results = run(args.episodes, args.num_envs, args.size, args.p)
+    print(f"{'trainer':<18} {'num_envs':>9} {'episodes':>9} {'seconds':>9} {'episodes/sec':>13}")
+    for row in results:
+        print(f"{row['trainer']:<18} {row['num_envs']:>9} {row['episodes']:>9} {row['seconds']:>9.2f}"
+              f" {row['episodes_per_sec']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Runs every benchmark and writes the results as JSON, to be kept per change and
+compared against, run from Task_6 with
+
+    python -m benchmarks.suite --out benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.suite --quick --baseline benchmarks/results/<older>.json
+    python -m benchmarks.suite --quick --profile benchmarks/results/profile
+
+--profile also times the phases of a short train_model loop and of
+train_q_learning with custom_frozen_lake.profiling, writing a report and a
+collapsed-stack file per trainer for flamegraph.pl or speedscope.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import gym
+
+from benchmarks import bench_env, bench_import, bench_map_generation, bench_training
+from custom_frozen_lake.envs import VectorFrozenLakeEnv
+from custom_frozen_lake.profiling import Profiler
+from custom_frozen_lake.training import train_q_learning
+
+# more is better for rates, less for times
+HIGHER = ("per_sec", "fps", "flood", "carve", "dfs")
+LOWER = ("_ms", "seconds")
+
+
+def benchmarks(quick=False):
+    """name -> function running one benchmark module with the suite's settings"""
+    budget = 0.2 if quick else 1.0
+    return {
+        "import": lambda: bench_import.run(repeat=3 if quick else 5),
+        "env": lambda: bench_env.run(budget=budget),
+        "map_generation": lambda: bench_map_generation.run(
+            sizes=[8, 16, 32] if quick else bench_map_generation.SIZES, ps=[0.6, 0.8, 0.9], budget=budget
+        ),
+        "training": lambda: bench_training.run(episodes=500 if quick else 2000),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "gym": gym.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def run(names=None, quick=False) -> dict:
+    suite = benchmarks(quick)
+    results = {"environment": environment(), "quick": quick, "benchmarks": {}}
+    for name in names or suite:
+        start = time.perf_counter()
+        results["benchmarks"][name] = suite[name]()
+        print(f"{name}: {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.1) -> list:
+    """Rows whose rates dropped or times grew by more than threshold against baseline,
+    matching rows by position within each benchmark
+    """
+    regressions = []
+    for name, rows in results["benchmarks"].items():
+        for row, old in zip(rows, baseline["benchmarks"].get(name, [])):
+            for key, value in row.items():
+                if not isinstance(value, float) or not isinstance(old.get(key), (int, float)) or not old[key]:
+                    continue
+                ratio = value / old[key]
+                if key.endswith(HIGHER) and ratio < 1 - threshold or key.endswith(LOWER) and ratio > 1 + threshold:
+                    labels = {k: v for k, v in row.items() if not isinstance(v, float)}
+                    regressions.append({"benchmark": name, "row": labels, "metric": key,
+                                        "baseline": old[key], "value": value, "ratio": ratio})
+    return regressions
+
+
+def profile(out_dir, episodes=500, seed=0):
+    """Phase profiles of the train_model loop and of train_q_learning, written to out_dir"""
+    out_dir = Path(out_dir)
+
+    profiler = Profiler()
+    env = gym.make("CustomFrozenLake", seed=seed)
+    profiler.attach(env)
+    profiler.push("train_model")
+    bench_training.train_model_loop(env, np.zeros((16, 4, 4)), episodes, 0.8, profiler=profiler, seed=seed,
+                                    **bench_training.HYPERPARAMS)
+    profiler.pop()
+    profiler.detach(env)
+    (out_dir / "train_model.txt").parent.mkdir(exist_ok=True, parents=True)
+    (out_dir / "train_model.txt").write_text(profiler.report() + "\n")
+    profiler.write_collapsed(out_dir / "train_model.folded")
+
+    profiler = Profiler()
+    vec = VectorFrozenLakeEnv(num_envs=256, seed=seed)
+    profiler.push("train_q_learning")
+    train_q_learning(vec, np.zeros((16, 4, 4)), 50 * episodes, frozen_p=0.8, seed=seed, profiler=profiler,
+                     **bench_training.HYPERPARAMS)
+    profiler.pop()
+    (out_dir / "train_q_learning.txt").write_text(profiler.report() + "\n")
+    profiler.write_collapsed(out_dir / "train_q_learning.folded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(benchmarks()), help="benchmarks to run, all by default")
+    parser.add_argument("--quick", action="store_true", help="shorter measurements, for a first look")
+    parser.add_argument("--out", type=Path, help="JSON file to write, stdout by default")
+    parser.add_argument("--baseline", type=Path, help="earlier results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument("--profile", type=Path, help="directory for phase profiles of the training loops")
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        profile(args.profile)
+    results = run(args.only, args.quick)
+    if args.baseline is not None:
+        results["regressions"] = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        for r in results["regressions"]:
+            print(f"regression: {r['benchmark']} {r['row']} {r['metric']} "
+                  f"{r['baseline']:.4g} -> {r['value']:.4g}", file=sys.stderr)
+
+    text = json.dumps(results, indent=1)
+    if args.out is None:
+        print(text)
+    else:
+        args.out.parent.mkdir(exist_ok=True, parents=True)
+        args.out.write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Atomic training checkpoints.
+
+A checkpoint is one `.npz` file: arrays are stored as they are, everything
+else (RNG states, counters, hyperparameters) as one JSON entry, so loading
+never needs pickle. It is written to a temporary file next to the target and
+moved over it with os.replace, so a crash mid-write leaves the previous
+checkpoint intact.
+
+    save_checkpoint("training/run.ckpt.npz", qtable=qtable, episode=episode, rng=rng_state(rng))
+    state = load_checkpoint("training/run.ckpt.npz")
+    set_rng_state(rng, state["rng"])
+"""
+import json
+import os
+import random
+from pathlib import Path
+
+import numpy as np
+
+_META = "__meta__"
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def _split(entries: dict, prefix: str, arrays: dict) -> dict:
+    """Moves the arrays of (nested dicts of) entries into arrays under "a/b" keys, returns the rest"""
+    meta = {}
+    for key, value in entries.items():
+        if isinstance(value, np.ndarray):
+            arrays[prefix + key] = value
+        elif isinstance(value, dict):
+            meta[key] = _split(value, prefix + key + "/", arrays)
+        else:
+            meta[key] = value
+    return meta
+
+
+def save_checkpoint(path, **entries):
+    """Atomically writes entries to path; numpy arrays, also inside nested dicts,
+    are stored natively and the rest as JSON
+    """
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    arrays = {}
+    meta = _split(entries, "", arrays)
+    arrays[_META] = np.array(json.dumps(meta, default=_to_json))
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path) -> dict:
+    """Reads a checkpoint written by save_checkpoint back into one (nested) dict"""
+    with np.load(path, allow_pickle=False) as data:
+        state = json.loads(str(data[_META]))
+        for key in data.files:
+            if key == _META:
+                continue
+            *parents, name = key.split("/")
+            node = state
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[name] = data[key]
+    return state
+
+
+def rng_state(rng) -> dict:
+    """JSON-friendly state of a np.random.Generator or np.random.RandomState, or of the
+    global generators of the random and np.random modules (pass the module itself)
+    """
+    if rng is random:
+        return {"python": random.getstate()}
+    if rng is np.random or isinstance(rng, np.random.RandomState):
+        return {"legacy": rng.get_state(legacy=False)}
+    return rng.bit_generator.state
+
+
+def set_rng_state(rng, state: dict):
+    """Restores a state returned by rng_state (possibly after a JSON round trip)"""
+    if rng is random:
+        version, internal, gauss_next = state["python"]
+        random.setstate((version, tuple(internal), gauss_next))
+    elif rng is np.random or isinstance(rng, np.random.RandomState):
+        legacy = dict(state["legacy"])
+        legacy["state"] = dict(legacy["state"], key=np.asarray(legacy["state"]["key"], dtype=np.uint32))
+        rng.set_state(legacy)
+    else:
+        rng.bit_generator.state = state
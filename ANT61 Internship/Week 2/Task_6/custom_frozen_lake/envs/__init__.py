@@ -1,2 +1,7 @@
 from custom_frozen_lake.envs.custom_frozen_lake_env import FrozenLakeEnv
-#import custom_frozen_lake_env
\ No newline at end of file
+from custom_frozen_lake.envs.vector_frozen_lake_env import VectorFrozenLakeEnv
+#import custom_frozen_lake_env
+from custom_frozen_lake.envs.map_generation import generate_random_maps
+from custom_frozen_lake.envs.map_bank import build_map_bank, load_map_bank
+from custom_frozen_lake.envs.rendering import render_frames
+from custom_frozen_lake.envs.sparse_model import SparseModel, build_sparse_model
@@ -1,17 +1,37 @@
 from contextlib import closing
+from functools import lru_cache
 from io import StringIO
-from os import path
-from typing import Optional
-from xml import dom
-import pygame
-from pygame.constants import SRCALPHA
+from os import PathLike
+from typing import NamedTuple, Optional
 import numpy as np
 
 from gym import Env, spaces, utils
-from gym.envs.toy_text.utils import categorical_sample
+
+from custom_frozen_lake.envs.map_generation import (
+    ACTION_DELTAS,
+    TILE_G,
+    TILE_H,
+    as_tile_array,
+    generate_random_maps,
+    to_desc,
+)
+from custom_frozen_lake.envs.map_bank import load_map_bank
+from custom_frozen_lake.envs.sparse_model import build_sparse_model
+from custom_frozen_lake.rng import BlockRandom, seed_sequence
+from custom_frozen_lake.envs.rendering import (
+    board_kinds,
+    elf_kinds,
+    render_board,
+    render_sprites,
+    tile_atlas,
+    window_size,
+)
 
 DIR_STATE_FLAG = True
 
+# uniforms drawn from np_random at a time, for slips and start states
+RANDOM_BLOCK = 1024
+
 LEFT = 0
 DOWN = 1
 RIGHT = 2
@@ -32,11 +52,19 @@ MAPS = {
 }
 
 
-def generate_random_map(size=8, p=0.8):
+def generate_random_map(size=8, p=0.8, method="dfs", seed=None):
     """Generates a random valid map (one that has a path from start to goal)
     :param size: size of each side of the grid
     :param p: probability that a tile is frozen
+    :param method: "dfs" redraws the grid until a DFS finds a path, "flood" and
+        "carve" use the vectorised generators in map_generation.generate_random_maps
+    :param seed: seed, SeedSequence or np.random.Generator to draw from, for
+        reproducible maps (fresh entropy if None)
     """
+    if method != "dfs":
+        return to_desc(generate_random_maps(1, size, p, method=method, seed=seed)[0])
+
+    rng = np.random.default_rng(seed)
     valid = False
 
     # DFS to check that it's a valid path.
@@ -61,13 +89,13 @@ def generate_random_map(size=8, p=0.8):
 
     while not valid:
         p = min(1, p)
-        res = np.random.choice(["F", "H"], (size, size), p=[p, 1 - p])
+        res = rng.choice(["F", "H"], (size, size), p=[p, 1 - p])
         # Generate random start/goal locations
-        start = (np.random.randint(size), np.random.randint(size))
-        goal = (np.random.randint(size), np.random.randint(size))
+        start = tuple(rng.integers(size, size=2))
+        goal = tuple(rng.integers(size, size=2))
         # Make sure goal is not generated in the same place as start
         while goal == start:
-            goal = (np.random.randint(size), np.random.randint(size))
+            goal = tuple(rng.integers(size, size=2))
         res[start] = "S"
         res[goal] = "G"
         valid = is_valid(res, start)
@@ -76,6 +104,125 @@ def generate_random_map(size=8, p=0.8):
     return ["".join(x) for x in res]
 
 
+# bit each neighbour (LEFT, DOWN, RIGHT, UP) sets in the hole observation
+# (same bits as FrozenLakeEnv._check_adjacent)
+HOLE_BITS = np.array([0b0001, 0b0010, 0b0100, 0b1000], dtype=np.int64)
+
+
+def goal_direction(d_row, d_col):
+    """Vectorised version of FrozenLakeEnv._check_direction
+    :param d_row: goal row minus agent row
+    :param d_col: goal col minus agent col
+    """
+    d_row = np.asarray(d_row)
+    d_col = np.asarray(d_col)
+    # np.argmax picks the row axis on ties, hence >=
+    row_axis = np.abs(d_row) >= np.abs(d_col)
+    direction = np.where(d_col < 0, 0, np.where(d_col > 0, 2, 0))
+    direction = np.where(
+        row_axis, np.where(d_row < 0, 3, np.where(d_row > 0, 1, 0)), direction
+    )
+    return direction.astype(np.int64)
+
+
+def adjacent_holes(tiles):
+    """Vectorised version of FrozenLakeEnv._check_adjacent for every tile of a batch of maps
+    :param tiles: (N, nrow, ncol) uint8 maps
+    :return: (N, nrow, ncol) hole_state of an agent standing on each tile
+    """
+    N, nrow, ncol = tiles.shape
+    # pad with a ring of non-holes so tiles on the edge see nothing outside the map
+    holes = np.zeros((N, nrow + 2, ncol + 2), dtype=np.int64)
+    holes[:, 1:-1, 1:-1] = tiles == TILE_H
+    return (
+        holes[:, 1:-1, :-2] * HOLE_BITS[LEFT]
+        | holes[:, 2:, 1:-1] * HOLE_BITS[DOWN]
+        | holes[:, 1:-1, 2:] * HOLE_BITS[RIGHT]
+        | holes[:, :-2, 1:-1] * HOLE_BITS[UP]
+    )
+
+
+def observation_tables(descs):
+    """Observation of every state of one map, or of a batch of maps
+    :param descs: (nrow, ncol) or (N, nrow, ncol) map(s) in any format accepted by FrozenLakeEnv
+    :return: (hole_mask_obs, goal_dir_obs), each of shape (nS,) or (N, nS)
+    """
+    tiles = as_tile_array(descs)
+    single = tiles.ndim == 2
+    if single:
+        tiles = tiles[None]
+    N, nrow, ncol = tiles.shape
+    rows, cols = np.divmod(np.arange(nrow * ncol), ncol)
+    hole_mask_obs = adjacent_holes(tiles).reshape(N, -1)
+    goal = np.argmax(tiles.reshape(N, -1) == TILE_G, axis=1)
+    goal_row, goal_col = np.divmod(goal[:, None], ncol)
+    goal_dir_obs = goal_direction(goal_row - rows[None, :], goal_col - cols[None, :])
+    if single:
+        return hole_mask_obs[0], goal_dir_obs[0]
+    return hole_mask_obs, goal_dir_obs
+
+
+class TransitionModel(NamedTuple):
+    """Array form of the `P` dict. Entry [s, a, i] is the i-th outcome of taking
+    action a in state s; unused outcomes of terminal states have prob 0.
+    Models of a batch of maps have an extra leading map axis."""
+
+    next_state: np.ndarray  # (nS, nA, k) int64
+    prob: np.ndarray  # (nS, nA, k) float64
+    reward: np.ndarray  # (nS, nA, k) float64
+    done: np.ndarray  # (nS, nA, k) bool
+    cum_prob: np.ndarray  # (nS, nA, k) float64, cumulative sum of prob over k
+
+
+@lru_cache(maxsize=None)
+def grid_next_state(nrow, ncol, is_slippery=True):
+    """(nS, nA, k) next state of every move on an empty nrow x ncol grid.
+    It only depends on the grid shape, so it is shared by every map of that shape.
+    """
+    nA = 4
+    # slipping moves in the intended direction or either perpendicular one
+    offsets = np.array([-1, 0, 1]) if is_slippery else np.array([0])
+    moves = (np.arange(nA)[:, None] + offsets[None, :]) % 4  # (nA, k)
+
+    rows, cols = np.divmod(np.arange(nrow * ncol), ncol)
+    new_rows = np.clip(rows[:, None, None] + ACTION_DELTAS[moves, 0], 0, nrow - 1)
+    new_cols = np.clip(cols[:, None, None] + ACTION_DELTAS[moves, 1], 0, ncol - 1)
+    next_state = new_rows * ncol + new_cols
+    next_state.flags.writeable = False
+    return next_state
+
+
+def build_transition_model(desc, is_slippery=True, hole_reward=-0.1):
+    """Builds the TransitionModel of a map with vectorised index arithmetic
+    :param desc: map in any format accepted by FrozenLakeEnv, or a (N, nrow, ncol)
+        batch of maps, in which case every array gets a leading N axis
+    :param is_slippery: if True every action has 3 outcomes, else 1
+    :param hole_reward: reward for falling in a hole
+    """
+    tiles = as_tile_array(desc)
+    *batch, nrow, ncol = tiles.shape
+    tiles = tiles.reshape(*batch, nrow * ncol)
+
+    grid = grid_next_state(nrow, ncol, is_slippery)
+    nS, nA, k = grid.shape
+    next_state = np.broadcast_to(grid, (*batch, nS, nA, k)).copy()
+    new_tiles = np.take_along_axis(tiles, next_state.reshape(*batch, -1), axis=-1).reshape(next_state.shape)
+
+    prob = np.full(next_state.shape, 1.0 / k)
+    done = (new_tiles == TILE_G) | (new_tiles == TILE_H)
+    reward = (new_tiles == TILE_G).astype(np.float64)
+    # punishment for falling in hole
+    reward[new_tiles == TILE_H] = hole_reward
+
+    # goal and holes absorb with no reward
+    terminal = ((tiles == TILE_G) | (tiles == TILE_H))[..., None, None]
+    next_state = np.where(terminal, np.arange(nS)[:, None, None], next_state)
+    prob = np.where(terminal, np.arange(k) == 0, prob)
+    reward = np.where(terminal, 0.0, reward)
+    done = done | terminal
+
+    return TransitionModel(next_state, prob, reward, done, np.cumsum(prob, axis=-1))
+
 class FrozenLakeEnv(Env):
     """
     Frozen lake involves crossing a frozen lake from Start(S) to Goal(G) without falling into any Holes(H) by walking over
@@ -121,6 +268,12 @@ class FrozenLakeEnv(Env):
             "FHFFHFHF",
             "FFFHFFFG",
         ]
+    `map_bank`: optional (num_maps, nrow, ncol) uint8 array, or path to a .npy
+        map bank (see custom_frozen_lake.envs.map_bank). `reset(options={"map_index": i})`
+        then swaps in map i without constructing a new env.
+        Any other map can be swapped in with `reset(options={"desc": desc})`.
+    `seed`: seed (or SeedSequence) of the env's np_random, which draws the random
+        map when none is given as well as the slips, in blocks of RANDOM_BLOCK.
     `is_slippery`: True/False. If True will move in intended direction with
     probability of 1/3 else will move in either perpendicular direction with
     equal probability of 1/3 in both directions.
@@ -128,6 +281,10 @@ class FrozenLakeEnv(Env):
         - P(move left)=1/3
         - P(move up)=1/3
         - P(move down)=1/3
+    ### Transition Model
+    `env.transitions` holds the dynamics as (nS, nA, k) arrays (see TransitionModel).
+    `env.P` is still available as the usual dict-of-dicts, built from these
+    arrays the first time it is accessed.
     ### Version History
     * v1: Bug fixes to rewards
     * v0: Initial versions release (1.0.0)
@@ -135,73 +292,29 @@ class FrozenLakeEnv(Env):
 
     metadata = {"render_modes": ["human", "ansi", "rgb_array"], "render_fps": 4}
 
-    def __init__(self, desc=None, map_name=None, is_slippery=True, map_size=8, frozen_p=0.8):
+    def __init__(self, desc=None, map_name=None, is_slippery=True, map_size=8, frozen_p=0.8, map_bank=None,
+                 seed=None):
+        # maps for reset(options={"map_index": i}), see custom_frozen_lake.envs.map_bank
+        if isinstance(map_bank, (str, PathLike)):
+            map_bank = load_map_bank(map_bank)
+        self.map_bank = map_bank
+        self._seed(seed)
+        self.profiler = None
+
         if desc is None and map_name is None:
-            desc = generate_random_map(size=map_size, p=frozen_p)
+            if map_bank is not None: desc = map_bank[0]
+            else: desc = generate_random_map(size=map_size, p=frozen_p, seed=self.np_random)
         elif desc is None:
             desc = MAPS[map_name]
-        self.desc = desc = np.asarray(desc, dtype="c")
-        self.nrow, self.ncol = nrow, ncol = desc.shape
+        self.is_slippery = is_slippery
+        self.set_map(desc)
         self.reward_range = (0, 1)
 
-        # work out where the goal is, by first flattening map array 
-        # then getting index of first (and only, hopefully) occurance of "G"
-        self.goal = desc.ravel().tolist().index(b"G")
-
         nA = 4
-        nS = nrow * ncol
         nO = 16 # 16, if holes are present on all 4 sides, 
                 # but this scenario would never happen if the map generator does it job properly
         nDir = 4
 
-        self.initial_state_distrib = np.array(desc == b"S").astype("float64").ravel()
-        self.initial_state_distrib /= self.initial_state_distrib.sum()
-
-        self.P = {s: {a: [] for a in range(nA)} for s in range(nS)}
-
-        # returns integer representation of 2D coordinates as state
-        def to_s(row, col):
-            return row * ncol + col
-
-        def inc(row, col, a):
-            if a == LEFT:
-                col = max(col - 1, 0)
-            elif a == DOWN:
-                row = min(row + 1, nrow - 1)
-            elif a == RIGHT:
-                col = min(col + 1, ncol - 1)
-            elif a == UP:
-                row = max(row - 1, 0)
-            return (row, col)
-
-        def update_probability_matrix(row, col, action):
-            newrow, newcol = inc(row, col, action)
-            newstate = to_s(newrow, newcol)
-            newletter = desc[newrow, newcol]
-            done = bytes(newletter) in b"GH"
-            reward = float(newletter == b"G")
-            # punishment for falling in hole
-            if (newletter == b"H"): reward = -0.1
-            return newstate, reward, done
-
-        # probabilities of position transistion
-        for row in range(nrow):
-            for col in range(ncol):
-                s = to_s(row, col)
-                for a in range(4):
-                    li = self.P[s][a]
-                    letter = desc[row, col]
-                    if letter in b"GH":
-                        li.append((1.0, s, 0, True))
-                    else:
-                        if is_slippery:
-                            for b in [(a - 1) % 4, a, (a + 1) % 4]:
-                                li.append(
-                                    (1.0 / 3.0, *update_probability_matrix(row, col, b))
-                                )
-                        else:
-                            li.append((1.0, *update_probability_matrix(row, col, a)))
-
         # self.observation_space = spaces.Discrete(nS)
         # observation space modified to only contain adjacent tiles and goal direction features
         
@@ -210,16 +323,77 @@ class FrozenLakeEnv(Env):
 
         self.action_space = spaces.Discrete(nA)
 
-        # pygame utils
-        self.window_size = (min(64 * ncol, 512), min(64 * nrow, 512))
+        # pygame utils (window_size is set by set_map)
         self.window_surface = None
         self.clock = None
-        self.hole_img = None
-        self.cracked_hole_img = None
-        self.ice_img = None
-        self.elf_images = None
-        self.goal_img = None
-        self.start_img = None
+
+    def _seed(self, seed):
+        """(Re)creates np_random, the same Generator gym's seeding makes for an int seed,
+        and the block of uniforms drawn from it"""
+        self._np_random = np.random.default_rng(seed_sequence(seed))
+        self._uniforms = BlockRandom(self._np_random, block=RANDOM_BLOCK)
+
+    def set_map(self, desc):
+        """Swaps in a new lake in place, rebuilding only the tables that depend on the map
+        (goal, start distribution, observation tables, transitions). Scaled render sprites are kept,
+        only the static board image is redrawn on the next render.
+        :param desc: map as a list of strings, or a (nrow, ncol) "c" or uint8 array
+        """
+        self.desc = desc = np.array(as_tile_array(desc)).view("c")
+        self.nrow, self.ncol = nrow, ncol = desc.shape
+        tiles = desc.ravel()
+
+        # work out where the goal is, by first flattening map array 
+        # then getting index of first (and only, hopefully) occurance of "G"
+        self.goal = int(np.flatnonzero(tiles == b"G")[0])
+
+        self.initial_state_distrib = (tiles == b"S").astype("float64")
+        self.initial_state_distrib /= self.initial_state_distrib.sum()
+        # observation of every state, so _check_adjacent/_check_direction are lookups
+        self.hole_mask_obs, self.goal_dir_obs = observation_tables(desc)
+
+        self.transitions = build_transition_model(desc, self.is_slippery)
+        self._P = None
+
+        # a differently sized map needs a differently sized window
+        size = window_size(nrow, ncol)
+        if size != getattr(self, "window_size", size) and getattr(self, "window_surface", None) is not None:
+            import pygame
+
+            if pygame.display.get_surface() is self.window_surface:
+                self.window_surface = pygame.display.set_mode(size)
+            else:
+                self.window_surface = pygame.Surface(size)
+        self.window_size = size
+        # tiles and grid lines of this map, composed on the next render
+        self._board_surface = None
+        self._board_frame = None
+        self._elf_cell = None
+
+    @property
+    def P(self):
+        """`{s: {a: [(p, s', r, done), ...]}}` view of `self.transitions`, built on first access"""
+        if self._P is None:
+            t = self.transitions
+            nS, nA, k = t.prob.shape
+            self._P = {
+                s: {
+                    a: [
+                        (float(t.prob[s, a, i]), int(t.next_state[s, a, i]),
+                         float(t.reward[s, a, i]), bool(t.done[s, a, i]))
+                        for i in range(k) if t.prob[s, a, i] > 0
+                    ]
+                    for a in range(nA)
+                }
+                for s in range(nS)
+            }
+        return self._P
+
+    def sparse_model(self):
+        """Transition model of the current map as one scipy.sparse CSR matrix per action,
+        for planners on lakes too large for `transitions` (see planning.sparse_value_iteration)
+        """
+        return build_sparse_model(self.desc, self.is_slippery)
 
     # new function to turn position state into 2D coordinates
     def _to_rc(self, s):
@@ -233,58 +407,41 @@ class FrozenLakeEnv(Env):
 
     # hole checking algorithm
     def _check_adjacent(self):
-        row, col = self._to_rc(self.s)
-        desc = self.desc
-        hole_state = 0b0000
-
-        # left
-        if not col-1 < 0:
-            # print(0, desc[row,col-1])
-            if self._is_hole(row,col-1):
-                hole_state += 0b0001
-        # down
-        if not row+1 > self.nrow-1:
-            # print(1, desc[row+1,col])
-            if self._is_hole(row+1,col):
-                hole_state += 0b0010
-        # right
-        if not col+1 > self.ncol-1:
-            # print(2, desc[row,col+1])
-            if self._is_hole(row,col+1):
-                hole_state += 0b0100
-        # up
-        if not row-1 < 0:
-            # print(3, desc[row-1,col])
-            if self._is_hole(row-1,col):
-                hole_state += 0b1000
-        return int(hole_state)
+        return int(self.hole_mask_obs[self.s])
 
     def _check_direction(self):
-        rc_goal = self._to_rc(self.goal)
-        rc_pos = self._to_rc(self.s)
-        vector = np.array(rc_goal) - np.array(rc_pos)
-        direction = 0
-
-        dominant_axis = np.argmax(abs(vector))
-        if dominant_axis == 0: 
-            if vector[0] < 0: direction = 3
-            elif vector[0] > 0: direction = 1
-        elif dominant_axis == 1:
-            if vector[1] < 0: direction = 0 
-            elif vector[1] > 0: direction = 2
-        return int(direction)
+        return int(self.goal_dir_obs[self.s])
+
+    def observe(self, states):
+        """Vectorised observation of an array of states of the current map"""
+        states = np.asarray(states)
+        if DIR_STATE_FLAG: return self.hole_mask_obs[states], self.goal_dir_obs[states]
+        else: return self.hole_mask_obs[states]
 
     def step(self, a):
-        transitions = self.P[self.s][a]
-        i = categorical_sample([t[0] for t in transitions], self.np_random)
-        # print(transitions[i], self.s)
-        p, s, r, d = transitions[i]
+        t = self.transitions
+        # same draw as categorical_sample, on the precomputed cumulative table
+        i = (t.cum_prob[self.s, a] > self._uniforms.random()).argmax()
+        p = float(t.prob[self.s, a, i])
+        s = int(t.next_state[self.s, a, i])
+        r = float(t.reward[self.s, a, i])
+        d = bool(t.done[self.s, a, i])
         self.s = s
         self.lastaction = a
         # return (int(s), r, d, {"prob": p})
         if DIR_STATE_FLAG: return (self._check_adjacent(), self._check_direction()), r, d, {"prob": p}
         else: return self._check_adjacent(), r, d, {"prob": p}
 
+    def enable_profiling(self, profiler):
+        """Times every step as an "env.step" phase of a custom_frozen_lake.profiling.Profiler,
+        or stops doing so when profiler is None. The timed step is bound on this instance
+        only and wraps the plain one, which stays untouched and costs nothing extra.
+        """
+        self.profiler = profiler
+        self.__dict__.pop("step", None)
+        if profiler is not None:
+            self.step = profiler.timed(FrozenLakeEnv.step.__get__(self), "env.step")
+
     def reset(
         self,
         *,
@@ -292,8 +449,14 @@ class FrozenLakeEnv(Env):
         return_info: bool = False,
         options: Optional[dict] = None,
     ):
-        super().reset(seed=seed)
-        self.s = categorical_sample(self.initial_state_distrib, self.np_random)
+        if seed is not None:
+            self._seed(seed)
+        if options is not None and "map_index" in options:
+            self.set_map(self.map_bank[options["map_index"]])
+        elif options is not None and "desc" in options:
+            self.set_map(options["desc"])
+        # same draw as categorical_sample
+        self.s = int((np.cumsum(self.initial_state_distrib) > self._uniforms.random()).argmax())
         self.lastaction = None
         # print(self.desc)
 
@@ -306,14 +469,50 @@ class FrozenLakeEnv(Env):
             if DIR_STATE_FLAG: return (self._check_adjacent(), self._check_direction()), {"prob": 1}
             else: return (self._check_adjacent()), {"prob": 1}
 
+    def state_dict(self) -> dict:
+        """Map, position and RNG state, for checkpoints"""
+        return {
+            "desc": as_tile_array(self.desc).copy(),
+            "s": self.s,
+            "lastaction": -1 if self.lastaction is None else int(self.lastaction),
+            "random": self._uniforms.state_dict(),
+        }
+
+    def load_state_dict(self, state: dict):
+        """Restores a state_dict"""
+        self.set_map(state["desc"])
+        self.s = int(state["s"])
+        self.lastaction = None if state["lastaction"] < 0 else int(state["lastaction"])
+        self._uniforms.load_state_dict(state["random"])
+
     def render(self, mode="human"):
         desc = self.desc.tolist()
         if mode == "ansi":
             return self._render_text(desc)
+        elif mode == "rgb_array":
+            return self._render_rgb()
         else:
             return self._render_gui(desc, mode)
 
+    def _render_rgb(self):
+        """rgb_array frame composed with NumPy from the tile atlas, no pygame display involved"""
+        if self._board_frame is None:
+            self._board_frame = render_board(self.desc)
+        frame = self._board_frame.copy()
+        cell_width = self.window_size[0] // self.ncol
+        cell_height = self.window_size[1] // self.nrow
+        row, col = self.s // self.ncol, self.s % self.ncol
+        last_action = -1 if self.lastaction is None else self.lastaction
+        kind = elf_kinds(board_kinds(self.desc)[row, col], last_action)
+        frame[row * cell_height:(row + 1) * cell_height, col * cell_width:(col + 1) * cell_width] = (
+            tile_atlas(cell_width, cell_height)[kind]
+        )
+        return frame
+
     def _render_gui(self, desc, mode):
+        # pygame is only imported once a window is needed, training never loads it
+        import pygame
+
         if self.window_surface is None:
             pygame.init()
             pygame.display.init()
@@ -322,101 +521,80 @@ class FrozenLakeEnv(Env):
                 self.window_surface = pygame.display.set_mode(self.window_size)
             else:  # rgb_array
                 self.window_surface = pygame.Surface(self.window_size)
+            self._elf_cell = None
         if self.clock is None:
             self.clock = pygame.time.Clock()
-        if self.hole_img is None:
-            file_name = path.join(path.dirname(__file__), "img/hole.png")
-            self.hole_img = pygame.image.load(file_name)
-        if self.cracked_hole_img is None:
-            file_name = path.join(path.dirname(__file__), "img/cracked_hole.png")
-            self.cracked_hole_img = pygame.image.load(file_name)
-        if self.ice_img is None:
-            file_name = path.join(path.dirname(__file__), "img/ice.png")
-            self.ice_img = pygame.image.load(file_name)
-        if self.goal_img is None:
-            file_name = path.join(path.dirname(__file__), "img/goal.png")
-            self.goal_img = pygame.image.load(file_name)
-        if self.start_img is None:
-            file_name = path.join(path.dirname(__file__), "img/stool.png")
-            self.start_img = pygame.image.load(file_name)
-        if self.elf_images is None:
-            elfs = [
-                path.join(path.dirname(__file__), "img/elf_left.png"),
-                path.join(path.dirname(__file__), "img/elf_down.png"),
-                path.join(path.dirname(__file__), "img/elf_right.png"),
-                path.join(path.dirname(__file__), "img/elf_up.png"),
-            ]
-            self.elf_images = [pygame.image.load(f_name) for f_name in elfs]
 
-        board = pygame.Surface(self.window_size, flags=SRCALPHA)
         cell_width = self.window_size[0] // self.ncol
         cell_height = self.window_size[1] // self.nrow
-        smaller_cell_scale = 0.6
-        small_cell_w = smaller_cell_scale * cell_width
-        small_cell_h = smaller_cell_scale * cell_height
-
-        # prepare images
-        last_action = self.lastaction if self.lastaction is not None else 1
-        elf_img = self.elf_images[last_action]
-        elf_scale = min(
-            small_cell_w / elf_img.get_width(),
-            small_cell_h / elf_img.get_height(),
-        )
-        elf_dims = (
-            elf_img.get_width() * elf_scale,
-            elf_img.get_height() * elf_scale,
-        )
-        elf_img = pygame.transform.scale(elf_img, elf_dims)
-        hole_img = pygame.transform.scale(self.hole_img, (cell_width, cell_height))
-        cracked_hole_img = pygame.transform.scale(
-            self.cracked_hole_img, (cell_width, cell_height)
-        )
-        ice_img = pygame.transform.scale(self.ice_img, (cell_width, cell_height))
-        goal_img = pygame.transform.scale(self.goal_img, (cell_width, cell_height))
-        start_img = pygame.transform.scale(self.start_img, (small_cell_w, small_cell_h))
-
-        for y in range(self.nrow):
-            for x in range(self.ncol):
-                rect = (x * cell_width, y * cell_height, cell_width, cell_height)
-                if desc[y][x] == b"H":
-                    self.window_surface.blit(hole_img, (rect[0], rect[1]))
-                elif desc[y][x] == b"G":
-                    self.window_surface.blit(ice_img, (rect[0], rect[1]))
-                    goal_rect = self._center_small_rect(rect, goal_img.get_size())
-                    self.window_surface.blit(goal_img, goal_rect)
-                elif desc[y][x] == b"S":
-                    self.window_surface.blit(ice_img, (rect[0], rect[1]))
-                    stool_rect = self._center_small_rect(rect, start_img.get_size())
-                    self.window_surface.blit(start_img, stool_rect)
-                else:
-                    self.window_surface.blit(ice_img, (rect[0], rect[1]))
-
-                pygame.draw.rect(board, (180, 200, 230), rect, 1)
+        sprites = render_sprites(cell_width, cell_height)
+
+        # the static board only changes with the map, after that a frame
+        # just restores the cell the elf left and paints the one it is on
+        if self._board_surface is None:
+            self._board_surface = self._compose_board(desc, sprites, cell_width, cell_height)
+            self._elf_cell = None
+        if self._elf_cell is None:
+            self.window_surface.blit(self._board_surface, (0, 0))
+            dirty = [self.window_surface.get_rect()]
+        else:
+            dirty = [self._elf_cell]
+            self.window_surface.blit(self._board_surface, self._elf_cell, self._elf_cell)
 
         # paint the elf
         bot_row, bot_col = self.s // self.ncol, self.s % self.ncol
-        cell_rect = (
+        cell_rect = pygame.Rect(
             bot_col * cell_width,
             bot_row * cell_height,
             cell_width,
             cell_height,
         )
         if desc[bot_row][bot_col] == b"H":
-            self.window_surface.blit(cracked_hole_img, (cell_rect[0], cell_rect[1]))
+            self.window_surface.blit(sprites["cracked_hole"], cell_rect.topleft)
+            pygame.draw.rect(self.window_surface, (180, 200, 230), cell_rect, 1)
         else:
+            last_action = self.lastaction if self.lastaction is not None else 1
+            elf_img = sprites["elf"][last_action]
             elf_rect = self._center_small_rect(cell_rect, elf_img.get_size())
             self.window_surface.blit(elf_img, elf_rect)
+        self._elf_cell = cell_rect
+        dirty.append(cell_rect)
 
-        self.window_surface.blit(board, board.get_rect())
         if mode == "human":
             pygame.event.pump()
-            pygame.display.update()
+            pygame.display.update(dirty)
             self.clock.tick(self.metadata["render_fps"])
         else:  # rgb_array
             return np.transpose(
                 np.array(pygame.surfarray.pixels3d(self.window_surface)), axes=(1, 0, 2)
             )
 
+    def _compose_board(self, desc, sprites, cell_width, cell_height):
+        """Draws the tiles and grid lines of the current map, without the elf, on a new surface"""
+        import pygame
+
+        surface = pygame.Surface(self.window_size)
+        board = pygame.Surface(self.window_size, flags=pygame.SRCALPHA)
+        for y in range(self.nrow):
+            for x in range(self.ncol):
+                rect = (x * cell_width, y * cell_height, cell_width, cell_height)
+                if desc[y][x] == b"H":
+                    surface.blit(sprites["hole"], (rect[0], rect[1]))
+                elif desc[y][x] == b"G":
+                    surface.blit(sprites["ice"], (rect[0], rect[1]))
+                    goal_rect = self._center_small_rect(rect, sprites["goal"].get_size())
+                    surface.blit(sprites["goal"], goal_rect)
+                elif desc[y][x] == b"S":
+                    surface.blit(sprites["ice"], (rect[0], rect[1]))
+                    stool_rect = self._center_small_rect(rect, sprites["start"].get_size())
+                    surface.blit(sprites["start"], stool_rect)
+                else:
+                    surface.blit(sprites["ice"], (rect[0], rect[1]))
+
+                pygame.draw.rect(board, (180, 200, 230), rect, 1)
+        surface.blit(board, board.get_rect())
+        return surface
+
     @staticmethod
     def _center_small_rect(big_rect, small_dims):
         offset_w = (big_rect[2] - small_dims[0]) / 2
@@ -443,6 +621,8 @@ class FrozenLakeEnv(Env):
 
     def close(self):
         if self.window_surface is not None:
+            import pygame
+
             pygame.display.quit()
             pygame.quit()
 
@@ -0,0 +1,50 @@
+"""Pre-generated banks of random maps stored as (num_maps, size, size) uint8 .npy files.
+
+Building a bank once and memory-mapping it during training replaces the
+per-episode `gym.make` + `generate_random_map` call with an O(map size) swap:
+
+    bank = build_map_bank("maps_8_0.8.npy", 1_000_000, size=8, p=0.8)
+    env = gym.make("CustomFrozenLake", map_bank="maps_8_0.8.npy")
+    state = env.reset(options={"map_index": i})
+"""
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from custom_frozen_lake.envs.map_generation import generate_random_maps
+
+
+def build_map_bank(path, num_maps: int, size: int = 8, p: float = 0.8, method: str = "flood",
+                   seed: Optional[int] = None, chunk_size: int = 1 << 16) -> np.ndarray:
+    """Generates `num_maps` valid maps straight into a .npy file and returns it memory-mapped
+    :param path: output .npy file, a .json file with the generation parameters is written next to it
+    :param num_maps: number of maps in the bank
+    :param size: size of each side of the grid
+    :param p: probability that a tile is frozen
+    :param method: generation method of generate_random_maps
+    :param seed: seed for reproducible banks
+    :param chunk_size: number of maps generated per batch
+    """
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    rng = np.random.default_rng(seed)
+    bank = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(num_maps, size, size))
+    for lo in range(0, num_maps, chunk_size):
+        hi = min(lo + chunk_size, num_maps)
+        bank[lo:hi] = generate_random_maps(hi - lo, size, p, method=method, seed=rng)
+    bank.flush()
+    del bank
+
+    params = {"num_maps": num_maps, "size": size, "p": p, "method": method, "seed": seed}
+    path.with_suffix(".json").write_text(json.dumps(params, indent=1))
+    return load_map_bank(path)
+
+
+def load_map_bank(path) -> np.ndarray:
+    """Memory-maps a bank read-only, so every process shares one copy in the page cache"""
+    bank = np.load(path, mmap_mode="r")
+    if bank.dtype != np.uint8 or bank.ndim != 3:
+        raise ValueError(f"{path} is not a map bank of (num_maps, nrow, ncol) uint8 maps")
+    return bank
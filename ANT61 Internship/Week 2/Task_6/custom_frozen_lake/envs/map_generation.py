@@ -0,0 +1,134 @@
+import numpy as np
+
+TILE_S, TILE_F, TILE_H, TILE_G = (ord(c) for c in "SFHG")
+
+# row/col offsets of the actions LEFT, DOWN, RIGHT, UP
+ACTION_DELTAS = np.array([[0, -1], [1, 0], [0, 1], [-1, 0]], dtype=np.int64)
+
+# cap on the number of cells held in one batch of candidate maps
+MAX_BATCH_CELLS = 1 << 24
+
+
+def as_tile_array(descs):
+    """Converts maps (list of strings, "c" array or uint8 array) to a uint8 array of tile codes"""
+    if isinstance(descs, np.ndarray) and descs.dtype == np.uint8:
+        return descs
+    return np.asarray(descs, dtype="c").view(np.uint8)
+
+
+def to_desc(tiles):
+    """Converts one (nrow, ncol) uint8 map back to the list of strings format"""
+    return [row.tobytes().decode("ascii") for row in np.asarray(tiles, dtype=np.uint8)]
+
+
+def flood_reachable(passable, start, goal):
+    """Batched flood fill, checks whether goal can be reached from start
+    :param passable: (B, nrow, ncol) bool array, False for holes
+    :param start: (B,) flat index of the start tile of every map
+    :param goal: (B,) flat index of the goal tile of every map
+    """
+    B = len(passable)
+    found = np.zeros(B, dtype=bool)
+    idx = np.arange(B)
+    reach = np.zeros_like(passable, dtype=bool)
+    reach.reshape(B, -1)[idx, start] = True
+    passable = passable.astype(bool)
+    goal = np.asarray(goal)
+
+    while idx.size:
+        grown = reach.copy()
+        grown[:, 1:, :] |= reach[:, :-1, :]
+        grown[:, :-1, :] |= reach[:, 1:, :]
+        grown[:, :, 1:] |= reach[:, :, :-1]
+        grown[:, :, :-1] |= reach[:, :, 1:]
+        grown &= passable
+
+        hit = grown.reshape(len(idx), -1)[np.arange(len(idx)), goal]
+        found[idx[hit]] = True
+        # maps that reached the goal or stopped growing are done
+        keep = ~hit & (grown != reach).any(axis=(1, 2))
+        if keep.all():
+            reach = grown
+        else:
+            idx, reach, passable, goal = idx[keep], grown[keep], passable[keep], goal[keep]
+    return found
+
+
+def _start_goal(rng, num_maps, nS):
+    start = rng.integers(nS, size=num_maps)
+    # uniform over every tile except the start one
+    goal = (start + rng.integers(1, nS, size=num_maps)) % nS
+    return start, goal
+
+
+def _place(tiles, start, goal):
+    flat = tiles.reshape(len(tiles), -1)
+    lanes = np.arange(len(tiles))
+    flat[lanes, start] = TILE_S
+    flat[lanes, goal] = TILE_G
+    return tiles
+
+
+def _generate_flood(rng, num_maps, size, p):
+    nS = size * size
+    out = np.empty((num_maps, size, size), dtype=np.uint8)
+    done = 0
+    while done < num_maps:
+        # oversample, rejected candidates are simply dropped
+        batch = min(max(2 * (num_maps - done), 16), max(MAX_BATCH_CELLS // nS, 1))
+        tiles = np.where(rng.random((batch, size, size)) < p, TILE_F, TILE_H).astype(np.uint8)
+        start, goal = _start_goal(rng, batch, nS)
+        _place(tiles, start, goal)
+        valid = flood_reachable(tiles != TILE_H, start, goal)
+        accepted = tiles[valid][: num_maps - done]
+        out[done:done + len(accepted)] = accepted
+        done += len(accepted)
+    return out
+
+
+def _generate_carve(rng, num_maps, size, p):
+    nS = size * size
+    tiles = np.where(rng.random((num_maps, size, size)) < p, TILE_F, TILE_H).astype(np.uint8)
+    start, goal = _start_goal(rng, num_maps, nS)
+    s_row, s_col = np.divmod(start, size)
+    g_row, g_col = np.divmod(goal, size)
+
+    # a random monotone path from S to G: shuffle the |d_row| row moves
+    # and |d_col| column moves of every map, padding moves stay in place
+    n_row = np.abs(g_row - s_row)
+    n_col = np.abs(g_col - s_col)
+    length = n_row + n_col
+    max_len = 2 * (size - 1)
+    pos = np.arange(max_len)
+    keys = rng.random((num_maps, max_len))
+    keys[pos >= length[:, None]] = np.inf
+    order = np.argsort(keys, axis=1)
+    is_row = order < n_row[:, None]
+    is_col = (order >= n_row[:, None]) & (order < length[:, None])
+    rows = s_row[:, None] + np.cumsum(is_row * np.sign(g_row - s_row)[:, None], axis=1)
+    cols = s_col[:, None] + np.cumsum(is_col * np.sign(g_col - s_col)[:, None], axis=1)
+    tiles[np.arange(num_maps)[:, None], rows, cols] = TILE_F
+
+    return _place(tiles, start, goal)
+
+
+def generate_random_maps(num_maps, size=8, p=0.8, method="flood", seed=None):
+    """Generates a batch of random valid maps as a (num_maps, size, size) uint8 array
+    :param num_maps: number of maps to generate
+    :param size: size of each side of the grid
+    :param p: probability that a tile is frozen
+    :param method: "flood" keeps the distribution of generate_random_map, redrawing
+        maps whose goal is not reachable (checked with a batched flood fill);
+        "carve" carves a random path from S to G first and then adds holes,
+        so every draw is valid
+    :param seed: seed or np.random.Generator used for the draws
+    """
+    rng = np.random.default_rng(seed)
+    p = min(1, p)
+    if size < 2:
+        raise ValueError("size must be at least 2 to fit both S and G")
+    if method == "flood":
+        return _generate_flood(rng, num_maps, size, p)
+    elif method == "carve":
+        return _generate_carve(rng, num_maps, size, p)
+    raise ValueError(f"Unknown map generation method {method!r}")
@@ -0,0 +1,184 @@
+"""Render assets and a pure-NumPy rgb_array renderer.
+
+Every cell of a frame is one of a few fixed pictures (a tile, a tile with the
+elf on it, the cracked hole), each already carrying its grid line. They are
+drawn once per cell size into an atlas, after which any frame, or a whole
+batch of frames, is composed by indexing the atlas with the map and the elf
+position. No pygame display is ever opened; pygame is only imported, and used
+offscreen to decode and scale the images, when an atlas is first built.
+
+    frames = render_frames(env.descs, env.s, env.lastaction)  # (N, H, W, 3) uint8
+"""
+from functools import lru_cache
+from os import path
+
+import numpy as np
+
+from custom_frozen_lake.envs.map_generation import TILE_G, TILE_H, TILE_S, as_tile_array
+
+GRID_COLOR = (180, 200, 230)
+
+# atlas entries: bare F/H/S/G tiles, then the elf facing LEFT/DOWN/RIGHT/UP
+# on F, S and G, then the cracked hole
+TILE_KINDS = "FHSG"
+ELF_OFFSET = len(TILE_KINDS)
+CRACKED_HOLE = ELF_OFFSET + 3 * 4
+
+
+def window_size(nrow, ncol):
+    """Pixel size (width, height) of the window of a nrow x ncol map"""
+    return (min(64 * ncol, 512), min(64 * nrow, 512))
+
+
+@lru_cache(maxsize=None)
+def _load_images():
+    """Render images at their original size, loaded once per process"""
+    import pygame
+
+    img_dir = path.join(path.dirname(__file__), "img")
+    load = lambda name: pygame.image.load(path.join(img_dir, name))
+    return {
+        "hole": load("hole.png"),
+        "cracked_hole": load("cracked_hole.png"),
+        "ice": load("ice.png"),
+        "goal": load("goal.png"),
+        "start": load("stool.png"),
+        "elf": [load(f"elf_{d}.png") for d in ("left", "down", "right", "up")],
+    }
+
+
+@lru_cache(maxsize=None)
+def render_sprites(cell_width, cell_height):
+    """Render images scaled to one cell size, shared by every env in the process"""
+    import pygame
+
+    images = _load_images()
+    smaller_cell_scale = 0.6
+    small_cell_w = smaller_cell_scale * cell_width
+    small_cell_h = smaller_cell_scale * cell_height
+
+    elf_images = []
+    for elf_img in images["elf"]:
+        elf_scale = min(
+            small_cell_w / elf_img.get_width(),
+            small_cell_h / elf_img.get_height(),
+        )
+        elf_dims = (
+            elf_img.get_width() * elf_scale,
+            elf_img.get_height() * elf_scale,
+        )
+        elf_images.append(pygame.transform.scale(elf_img, elf_dims))
+    return {
+        "hole": pygame.transform.scale(images["hole"], (cell_width, cell_height)),
+        "cracked_hole": pygame.transform.scale(images["cracked_hole"], (cell_width, cell_height)),
+        "ice": pygame.transform.scale(images["ice"], (cell_width, cell_height)),
+        "goal": pygame.transform.scale(images["goal"], (cell_width, cell_height)),
+        "start": pygame.transform.scale(images["start"], (small_cell_w, small_cell_h)),
+        "elf": elf_images,
+    }
+
+
+def center_small_rect(big_rect, small_dims):
+    offset_w = (big_rect[2] - small_dims[0]) / 2
+    offset_h = (big_rect[3] - small_dims[1]) / 2
+    return (
+        big_rect[0] + offset_w,
+        big_rect[1] + offset_h,
+    )
+
+
+@lru_cache(maxsize=None)
+def tile_atlas(cell_width, cell_height):
+    """(CRACKED_HOLE + 1, cell_height, cell_width, 3) read-only uint8 array of every cell picture"""
+    import pygame
+
+    sprites = render_sprites(cell_width, cell_height)
+    rect = (0, 0, cell_width, cell_height)
+
+    def cell(*layers):
+        surface = pygame.Surface((cell_width, cell_height))
+        for img in layers:
+            surface.blit(img, center_small_rect(rect, img.get_size()))
+        pygame.draw.rect(surface, GRID_COLOR, rect, 1)
+        return pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+
+    bare = {
+        "F": [sprites["ice"]],
+        "H": [sprites["hole"]],
+        "S": [sprites["ice"], sprites["start"]],
+        "G": [sprites["ice"], sprites["goal"]],
+    }
+    cells = [cell(*bare[kind]) for kind in TILE_KINDS]
+    cells += [cell(*bare[kind], elf) for kind in "FSG" for elf in sprites["elf"]]
+    cells.append(cell(sprites["cracked_hole"]))
+    atlas = np.stack(cells)
+    atlas.flags.writeable = False
+    return atlas
+
+
+def board_kinds(descs):
+    """Atlas index of every bare cell of one (nrow, ncol) or a batch of (N, nrow, ncol) maps"""
+    tiles = as_tile_array(descs)
+    kinds = np.zeros(tiles.shape, dtype=np.intp)
+    kinds[tiles == TILE_H] = 1
+    kinds[tiles == TILE_S] = 2
+    kinds[tiles == TILE_G] = 3
+    return kinds
+
+
+def elf_kinds(bare, last_actions):
+    """Atlas index of the elf cells, given their bare kinds and the last actions (-1/None for none)"""
+    bare = np.asarray(bare)
+    # no action yet draws the elf facing down, like FrozenLakeEnv
+    facing = np.where(np.asarray(last_actions) < 0, 1, last_actions)
+    # bare F/S/G map to their block of 4 elf pictures, holes to the cracked hole
+    block = np.array([0, -1, 1, 2])[bare]
+    return np.where(block < 0, CRACKED_HOLE, ELF_OFFSET + 4 * block + facing)
+
+
+def render_frames(descs, states, last_actions=None, out=None):
+    """Renders a batch of envs into an (N, H, W, 3) uint8 buffer, pixel-identical to rgb_array mode
+    :param descs: (N, nrow, ncol) maps, all of the same shape
+    :param states: (N,) flat elf position on every map
+    :param last_actions: (N,) last action of every env, -1 (or None for all) draws the elf facing down
+    :param out: optional preallocated (N, H, W, 3) uint8 array to render into, e.g. a video buffer
+    """
+    kinds = board_kinds(descs)
+    N, nrow, ncol = kinds.shape
+    width, height = window_size(nrow, ncol)
+    cell_width, cell_height = width // ncol, height // nrow
+    atlas = tile_atlas(cell_width, cell_height)
+
+    states = np.asarray(states)
+    last_actions = np.full(N, -1) if last_actions is None else np.asarray(last_actions)
+    flat = kinds.reshape(N, -1)
+    lanes = np.arange(N)
+    flat[lanes, states] = elf_kinds(flat[lanes, states], last_actions)
+
+    if out is None:
+        out = np.zeros((N, height, width, 3), dtype=np.uint8)
+    _paste(out, kinds, atlas)
+    return out
+
+
+def _paste(frames, kinds, atlas):
+    """Writes atlas[kinds] cell by cell into the top left of (N, H, W, 3) frames"""
+    N, nrow, ncol = kinds.shape
+    _, cell_height, cell_width, _ = atlas.shape
+    # the leftover strip of a window not divisible by the cell size stays black
+    board = frames[:, :nrow * cell_height, :ncol * cell_width].reshape(N, nrow, cell_height, ncol, cell_width * 3)
+    rows = atlas.reshape(len(atlas), cell_height, cell_width * 3)
+    # one gather per board column keeps every write a contiguous pixel row of a cell
+    for col in range(ncol):
+        board[:, :, :, col] = rows[kinds[:, :, col]]
+
+
+def render_board(desc):
+    """(H, W, 3) frame of one (nrow, ncol) map without the elf"""
+    kinds = board_kinds(desc)
+    nrow, ncol = kinds.shape
+    width, height = window_size(nrow, ncol)
+    cell_width, cell_height = width // ncol, height // nrow
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    _paste(frame[None], kinds[None], tile_atlas(cell_width, cell_height))
+    return frame
@@ -0,0 +1,71 @@
+"""scipy.sparse export of the FrozenLakeEnv transition model, for lakes too
+large for the dense (nS, nA, k) TransitionModel arrays and nS x nS planners.
+
+scipy is only needed by this module and is imported when a model is built.
+"""
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from custom_frozen_lake.envs.map_generation import ACTION_DELTAS, TILE_G, TILE_H, as_tile_array
+
+
+class SparseModel(NamedTuple):
+    """Transition model of one map with one CSR matrix per action. G and H are
+    absorbing with value 0, so transitions into them only show up in `reward`."""
+
+    transitions: Tuple  # nA (nS, nS) csr_matrix, [s, s'] = prob of moving on to s' without the episode ending
+    reward: np.ndarray  # (nA, nS) expected immediate reward of taking each action in each state
+    terminal: np.ndarray  # (nS,) bool, G and H tiles
+
+    @property
+    def stacked(self):
+        """(nA * nS, nS) csr_matrix of all actions, row a * nS + s"""
+        from scipy import sparse
+
+        return sparse.vstack(self.transitions, format="csr")
+
+
+def build_sparse_model(desc, is_slippery=True, hole_reward=-0.1) -> SparseModel:
+    """Builds the SparseModel of one map straight from its tiles, one action at a time,
+    so memory stays at a few arrays of nS * k entries even for million-state lakes
+    :param desc: map in any format accepted by FrozenLakeEnv
+    :param is_slippery: if True every action has 3 outcomes, else 1
+    :param hole_reward: reward for falling in a hole
+    """
+    from scipy import sparse
+
+    tiles = as_tile_array(desc)
+    nrow, ncol = tiles.shape
+    nS = nrow * ncol
+    tiles = tiles.ravel()
+    terminal = (tiles == TILE_G) | (tiles == TILE_H)
+    tile_reward = np.where(tiles == TILE_G, 1.0, np.where(tiles == TILE_H, hole_reward, 0.0))
+    # slipping moves in the intended direction or either perpendicular one
+    offsets = (-1, 0, 1) if is_slippery else (0,)
+    k = len(offsets)
+    index_dtype = np.int32 if nS < 2**31 else np.int64
+    rows, cols = np.divmod(np.arange(nS, dtype=index_dtype), ncol)
+
+    transitions = []
+    reward = np.zeros((len(ACTION_DELTAS), nS))
+    for a in range(len(ACTION_DELTAS)):
+        next_state = np.empty((nS, k), dtype=index_dtype)
+        for i, offset in enumerate(offsets):
+            # python ints, so the offsets keep rows and cols in index_dtype
+            d_row, d_col = ACTION_DELTAS[(a + offset) % 4].tolist()
+            next_state[:, i] = np.clip(rows + d_row, 0, nrow - 1) * ncol + np.clip(cols + d_col, 0, ncol - 1)
+        # terminal states have no outgoing transitions, moves into G or H end the episode
+        prob = np.where(terminal[next_state] | terminal[:, None], 0.0, 1.0 / k)
+        reward[a] = np.where(terminal, 0.0, tile_reward[next_state].sum(axis=1) / k)
+
+        matrix = sparse.csr_matrix(
+            (prob.ravel(), next_state.ravel(), np.arange(0, nS * k + 1, k, dtype=index_dtype)),
+            shape=(nS, nS),
+        )
+        # slips into a wall land on the same state twice
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        transitions.append(matrix)
+
+    return SparseModel(tuple(transitions), reward, terminal)
@@ -0,0 +1,249 @@
+from typing import Optional
+
+import numpy as np
+
+from gym import spaces
+
+from custom_frozen_lake.envs.custom_frozen_lake_env import (
+    DIR_STATE_FLAG,
+    MAPS,
+    grid_next_state,
+    observation_tables,
+)
+from custom_frozen_lake.envs.map_generation import (
+    TILE_G,
+    TILE_H,
+    TILE_S,
+    as_tile_array,
+    generate_random_maps,
+)
+from custom_frozen_lake.envs.rendering import render_frames
+from custom_frozen_lake.rng import LaneRandom, seed_sequence
+
+class VectorFrozenLakeEnv:
+    """
+    Batched version of FrozenLakeEnv that advances `num_envs` agents, each on its
+    own map, with a single call. All maps must have the same shape.
+    ### Arguments
+    ```
+    VectorFrozenLakeEnv(descs=None, num_envs=1024, is_slippery=True, map_size=8, frozen_p=0.8)
+    ```
+    `descs`: list of maps (each in the `desc` format accepted by FrozenLakeEnv),
+        or a (N, nrow, ncol) array of tile bytes. If None, `num_envs` random maps
+        are generated with `generate_random_maps(num_envs, map_size, frozen_p)`.
+    `map_name`: preloaded map used for every lane when `descs` is None.
+    `max_episode_steps`: if set, lanes are truncated (and reset) after this many steps.
+    `observation`: "features" for the (hole_state, direction) observation of
+        FrozenLakeEnv, or "position" for the flat state index used by gym's FrozenLake.
+    `hole_reward`: reward for falling in a hole (gym's FrozenLake uses 0).
+    `auto_reset`: if True, lanes that finish are moved back to their start tile
+        in the same `step` call, with lastaction cleared as by `reset`. The
+        observation of the finished episode is returned in `info["terminal_observation"]`.
+    `seed`: int or SeedSequence; the random maps and the slips get independent
+        children of it, and every lane its own slip stream (see custom_frozen_lake.rng).
+    ### Step
+    `step(actions)` takes an int array of shape (num_envs,) and returns
+    `(obs, rewards, dones, info)` where every entry is an array over lanes.
+    With DIR_STATE_FLAG the observation is the tuple `(hole_state, direction)`
+    of int arrays, so `qtable[obs]` gives the (num_envs, nA) action values.
+    """
+
+    def __init__(
+        self,
+        descs=None,
+        num_envs: Optional[int] = None,
+        map_name: Optional[str] = None,
+        is_slippery: bool = True,
+        map_size: int = 8,
+        frozen_p: float = 0.8,
+        max_episode_steps: Optional[int] = None,
+        auto_reset: bool = True,
+        seed=None,
+        observation: str = "features",
+        hole_reward: float = -0.1,
+    ):
+        maps_seed, slips_seed = seed_sequence(seed).spawn(2)
+        if descs is None:
+            if num_envs is None:
+                raise ValueError("Either descs or num_envs must be given")
+            if map_name is not None:
+                descs = [MAPS[map_name]] * num_envs
+            else:
+                descs = generate_random_maps(
+                    num_envs, map_size, frozen_p, seed=maps_seed
+                )
+        self.descs = as_tile_array(descs).copy()
+        if self.descs.ndim != 3:
+            raise ValueError("descs must stack into a (N, nrow, ncol) array")
+        if num_envs is not None and num_envs != len(self.descs):
+            raise ValueError("num_envs does not match the number of maps")
+        self.num_envs, self.nrow, self.ncol = self.descs.shape
+        self.is_slippery = is_slippery
+        self.max_episode_steps = max_episode_steps
+        self.auto_reset = auto_reset
+        if observation not in ("features", "position"):
+            raise ValueError(f"Unknown observation type {observation!r}")
+        self.observation = observation
+        self.hole_reward = hole_reward
+        self.reward_range = (min(hole_reward, 0), 1)
+
+        nA = 4
+        nO = 16
+        nDir = 4
+        if observation == "position":
+            self.single_observation_space = spaces.Discrete(self.nrow * self.ncol)
+        elif DIR_STATE_FLAG:
+            self.single_observation_space = spaces.Tuple(
+                (spaces.Discrete(nO), spaces.Discrete(nDir))
+            )
+        else:
+            self.single_observation_space = spaces.Discrete(nO)
+        self.single_action_space = spaces.Discrete(nA)
+
+        self._lanes = np.arange(self.num_envs)
+        # next state of every (state, direction) on an empty grid
+        self._grid_moves = grid_next_state(self.nrow, self.ncol, is_slippery=False)[:, :, 0]
+        self._load_maps()
+
+        self.s = self.start.copy()
+        self.elapsed_steps = np.zeros(self.num_envs, dtype=np.int64)
+        self.lastaction = np.full(self.num_envs, -1, dtype=np.int64)
+        self.slips = LaneRandom(slips_seed, self.num_envs)
+
+    def _load_maps(self, lanes=None):
+        flat = self.descs.reshape(self.num_envs, -1)
+        if lanes is None:
+            lanes = slice(None)
+            nS = self.nrow * self.ncol
+            self.start = np.empty(self.num_envs, dtype=np.int64)
+            self.goal = np.empty(self.num_envs, dtype=np.int64)
+            self.hole_mask_obs = np.empty((self.num_envs, nS), dtype=np.int64)
+            self.goal_dir_obs = np.empty((self.num_envs, nS), dtype=np.int64)
+        # first (and only) S and G of every map
+        self.start[lanes] = np.argmax(flat[lanes] == TILE_S, axis=1)
+        self.goal[lanes] = np.argmax(flat[lanes] == TILE_G, axis=1)
+        self.hole_mask_obs[lanes], self.goal_dir_obs[lanes] = observation_tables(self.descs[lanes])
+
+    def set_maps(self, lanes, descs):
+        """Replace the maps of the given lanes and move them to their start tile
+        :param lanes: index (or indices) of the lanes to replace
+        :param descs: map (or maps) of the same shape as the current ones
+        """
+        lanes = np.atleast_1d(lanes)
+        descs = as_tile_array(descs)
+        self.descs[lanes] = descs.reshape((-1, self.nrow, self.ncol))
+        self._load_maps(lanes)
+        self.s[lanes] = self.start[lanes]
+        self.elapsed_steps[lanes] = 0
+        self.lastaction[lanes] = -1
+
+    def observe(self, states=None):
+        """Observation of every lane, for `states` or the current ones"""
+        if states is None:
+            states = self.s
+        if self.observation == "position":
+            return states.copy()
+        # flat index into the (N, nS) tables
+        idx = self._lanes * (self.nrow * self.ncol) + states
+        hole_state = self.hole_mask_obs.reshape(-1)[idx]
+        if DIR_STATE_FLAG:
+            return hole_state, self.goal_dir_obs.reshape(-1)[idx]
+        return hole_state
+
+    def reset(
+        self,
+        *,
+        seed=None,
+        return_info: bool = False,
+        options: Optional[dict] = None,
+    ):
+        if seed is not None:
+            self.slips = LaneRandom(seed_sequence(seed).spawn(2)[1], self.num_envs)
+        self.s = self.start.copy()
+        self.elapsed_steps[:] = 0
+        self.lastaction[:] = -1
+        obs = self.observe(self.s)
+        if not return_info:
+            return obs
+        return obs, {"prob": np.ones(self.num_envs)}
+
+    def step(self, actions: np.ndarray):
+        actions = np.asarray(actions, dtype=np.int64)
+        if self.is_slippery:
+            # intended direction or either perpendicular one, 1/3 each
+            moves = (actions + self.slips.integers(3) - 1) % 4
+            prob = np.full(self.num_envs, 1.0 / 3.0)
+        else:
+            moves = actions
+            prob = np.ones(self.num_envs)
+
+        flat = self.descs.reshape(self.num_envs, -1)
+        new_s = self._grid_moves[self.s, moves]
+        tiles = flat[self._lanes, new_s]
+
+        if self.auto_reset:
+            stuck = np.zeros(self.num_envs, dtype=bool)
+        else:
+            # lanes already sitting on G/H stay put
+            current = flat[self._lanes, self.s]
+            stuck = (current == TILE_G) | (current == TILE_H)
+            new_s = np.where(stuck, self.s, new_s)
+            tiles = np.where(stuck, current, tiles)
+
+        dones = ((tiles == TILE_G) | (tiles == TILE_H)) & ~stuck
+        rewards = np.where(tiles == TILE_G, 1.0, 0.0)
+        # punishment for falling in hole
+        rewards = np.where(tiles == TILE_H, self.hole_reward, rewards)
+        rewards = np.where(stuck, 0.0, rewards)
+        dones |= stuck
+
+        self.s = new_s
+        # a copy, auto-reset lanes clear theirs and actions may be the caller's array
+        self.lastaction = actions.copy()
+        self.elapsed_steps += 1
+
+        info = {"prob": prob}
+        if self.max_episode_steps is not None:
+            truncated = (self.elapsed_steps >= self.max_episode_steps) & ~dones
+            info["TimeLimit.truncated"] = truncated
+            dones = dones | truncated
+
+        obs = self.observe(self.s)
+        if self.auto_reset and dones.any():
+            info["terminal_observation"] = obs
+            self.s = np.where(dones, self.start, self.s)
+            self.elapsed_steps[dones] = 0
+            self.lastaction[dones] = -1
+            obs = self.observe(self.s)
+        return obs, rewards, dones, info
+
+    def state_dict(self) -> dict:
+        """Maps, positions, step counters and RNG state of every lane, for checkpoints"""
+        return {
+            "descs": self.descs.copy(),
+            "s": self.s.copy(),
+            "elapsed_steps": self.elapsed_steps.copy(),
+            "lastaction": self.lastaction.copy(),
+            "slips": self.slips.state_dict(),
+        }
+
+    def load_state_dict(self, state: dict):
+        """Restores a state_dict of an env with the same num_envs and map shape"""
+        self.descs[...] = state["descs"]
+        self._load_maps()
+        self.s = np.array(state["s"], dtype=np.int64)
+        self.elapsed_steps = np.array(state["elapsed_steps"], dtype=np.int64)
+        self.lastaction = np.array(state["lastaction"], dtype=np.int64)
+        self.slips.load_state_dict(state["slips"])
+
+    def render(self, mode="rgb_array", out=None):
+        """(num_envs, H, W, 3) uint8 frames of every lane, the same pictures as
+        FrozenLakeEnv's rgb_array mode, composed with NumPy without a pygame display
+        :param out: optional preallocated frame buffer to render into
+        """
+        if mode != "rgb_array":
+            raise ValueError(f"VectorFrozenLakeEnv only renders rgb_array, not {mode!r}")
+        return render_frames(self.descs, self.s, self.lastaction, out=out)
+
+    def close(self):
+        pass
@@ -0,0 +1,130 @@
+"""Experiment store for training and sweep results.
+
+A store is a directory of `.npz` shards, one per `append` call, holding the
+bulky arrays (Q-tables, reward curves), plus `index.jsonl` with one line per
+run: its hyperparameters, scalar scores and where its arrays live. Queries
+only read the index; arrays are loaded for the selected runs only.
+
+    store = ExperimentStore("experiments")
+    lr, g = np.meshgrid(learning_rates, gammas, indexing="ij")
+    store.append({"learning_rate": lr.ravel(), "gamma": g.ravel(), "frozen_p": 0.8,
+                  "total_episodes": 20000}, rewards=rewards_1000, qtables=qtables)
+
+    best = store.best(where={"frozen_p": 0.8})                 # run with the highest final_reward
+    print(best["gamma"], best["learning_rate"])
+    qtable = store.load("qtables", best["run"])
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from custom_frozen_lake.checkpoint import save_checkpoint
+
+INDEX = "index.jsonl"
+
+
+class ExperimentStore:
+    """Append-only store of runs under `root`, see the module docstring"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(exist_ok=True, parents=True)
+        self._index = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX
+
+    def _rows(self) -> list:
+        if self._index is None:
+            self._index = []
+            if self.index_path.exists():
+                with open(self.index_path) as f:
+                    self._index = [json.loads(line) for line in f if line.strip()]
+        return self._index
+
+    def __len__(self):
+        return len(self._rows())
+
+    def append(self, params: dict, scores: Optional[dict] = None, **arrays) -> np.ndarray:
+        """Adds n runs at once and returns their run ids
+        :param params: hyperparameters, each a scalar shared by all runs or a length n sequence
+        :param scores: scalar results per run (scalar or length n), used by query/best;
+            "final_reward" defaults to the last column of `rewards`
+        :param arrays: per-run arrays with a leading axis of length n, e.g. qtables=(n, 16, 4, 4)
+            and rewards=(n, chunks) rewards_1000 curves, stored in one new shard
+        """
+        columns = {**params, **(scores or {})}
+        n = max([len(np.atleast_1d(v)) for v in columns.values()] + [len(v) for v in arrays.values()])
+        if "rewards" in arrays and "final_reward" not in columns:
+            columns["final_reward"] = np.asarray(arrays["rewards"])[:, -1]
+        columns = {k: np.broadcast_to(np.asarray(v), (n,)) for k, v in columns.items()}
+
+        rows = self._rows()
+        first = rows[-1]["run"] + 1 if rows else 0
+        shard = None
+        if arrays:
+            shard = f"shard_{first:08d}.npz"
+            save_checkpoint(self.root / shard, **{k: np.asarray(v) for k, v in arrays.items()})
+
+        new_rows = []
+        now = time.time()
+        for i in range(n):
+            row = {"run": first + i, "time": now, "shard": shard, "row": i}
+            row.update({k: v[i].item() for k, v in columns.items()})
+            new_rows.append(row)
+        # the shard is on disk before the index points at it
+        with open(self.index_path, "a") as f:
+            f.writelines(json.dumps(row) + "\n" for row in new_rows)
+            f.flush()
+            os.fsync(f.fileno())
+        rows.extend(new_rows)
+        return np.arange(first, first + n)
+
+    def query(self, where: Optional[dict] = None, columns: Optional[list] = None) -> dict:
+        """Runs matching `where`, as a dict of column arrays
+        :param where: {column: value} (floats compared with np.isclose) or {column: predicate}
+        :param columns: columns to return, all by default (missing values are None)
+        """
+        rows = self._rows()
+        for key, wanted in (where or {}).items():
+            if callable(wanted):
+                rows = [r for r in rows if key in r and wanted(r[key])]
+            elif isinstance(wanted, float):
+                rows = [r for r in rows if isinstance(r.get(key), (int, float)) and np.isclose(r[key], wanted)]
+            else:
+                rows = [r for r in rows if r.get(key) == wanted]
+        if columns is None:
+            columns = list(dict.fromkeys(k for r in rows for k in r))
+        return {k: np.array([r.get(k) for r in rows]) for k in columns}
+
+    def best(self, score: str = "final_reward", where: Optional[dict] = None, mode: str = "max") -> Optional[dict]:
+        """Index row of the best run matching `where`, e.g. best(where={"frozen_p": 0.8})["gamma"]"""
+        runs = self.query(where)
+        if not len(runs.get("run", [])):
+            return None
+        values = runs[score].astype(np.float64)
+        i = np.nanargmax(values) if mode == "max" else np.nanargmin(values)
+        return {k: v[i].item() if isinstance(v[i], np.generic) else v[i] for k, v in runs.items()}
+
+    def load(self, name: str, runs: Union[int, np.ndarray, list]) -> np.ndarray:
+        """Array `name` (e.g. "qtables", "rewards") of one run, or stacked for several runs"""
+        single = np.ndim(runs) == 0
+        runs = np.atleast_1d(runs)
+        by_run = {r["run"]: r for r in self._rows()}
+        shards = {}
+        out = []
+        for run in runs:
+            row = by_run[int(run)]
+            if row["shard"] is None:
+                raise KeyError(f"run {run} has no stored arrays")
+            # only the requested array of each shard is read
+            if row["shard"] not in shards:
+                with np.load(self.root / row["shard"], allow_pickle=False) as data:
+                    shards[row["shard"]] = data[name]
+            out.append(shards[row["shard"]][row["row"]])
+        return out[0] if single else np.stack(out)
@@ -0,0 +1,93 @@
+"""Pre-drawn epsilon-greedy exploration for the per-episode training loops.
+
+ExplorationSchedule computes the epsilon of every episode up front and draws
+the explore/exploit decision and random action of every step for a block of
+episodes with two array calls, so the loop only reads a buffer:
+
+    schedule = ExplorationSchedule(total_episodes, max_steps, env.action_space.n,
+                                   decay_rate=decay_rate_for(total_episodes, final_exploit=0.9))
+    for episode in range(total_episodes):
+        actions = schedule.actions(episode)
+        for step in range(max_steps):
+            action = actions[step]
+            if action < 0: action = np.argmax(qtable[state])
+
+Block b is drawn from its own stream spawned from the seed, so any episode's
+draws can be regenerated from its index alone: resuming from a checkpoint only
+needs the episode number.
+"""
+import numpy as np
+
+from custom_frozen_lake.rng import Seed, seed_sequence
+
+# marks a step that takes the greedy action in ExplorationSchedule.actions
+GREEDY = -1
+
+
+def epsilon_schedule(episodes, epsilon: float = 1, max_epsilon: float = 1, min_epsilon: float = 0,
+                     decay_rate: float = 0.00005):
+    """Epsilon used in each episode by train_model: `epsilon` for the first one, then
+    the exponential decay evaluated at the previous episode index
+    """
+    episodes = np.asarray(episodes)
+    decayed = min_epsilon + (max_epsilon - min_epsilon) * np.exp(-decay_rate * (episodes - 1))
+    return np.where(episodes == 0, epsilon, decayed)
+
+
+def decay_rate_for(total_episodes: int, final_exploit: float = 0.9, min_epsilon: float = 0,
+                   max_epsilon: float = 1) -> float:
+    """Exponential decay rate at which the chance to exploit reaches final_exploit
+    at the last episode, i.e. epsilon = 1 - final_exploit there
+    """
+    return -np.log((1 - final_exploit - min_epsilon) / (max_epsilon - min_epsilon)) / total_episodes
+
+
+class ExplorationSchedule:
+    """Per-step explore decisions and random actions of every episode of a run
+    :param total_episodes: episodes of the run
+    :param max_steps: steps per episode
+    :param n_actions: size of the action space
+    :param epsilon, max_epsilon, min_epsilon, decay_rate: as in train_model, epsilon
+        decays exponentially with the episode (see epsilon_schedule)
+    :param seed: int or SeedSequence of the draws
+    :param block: episodes drawn at a time
+    """
+
+    def __init__(self, total_episodes: int, max_steps: int, n_actions: int, epsilon: float = 1,
+                 max_epsilon: float = 1, min_epsilon: float = 0, decay_rate: float = 0.00005,
+                 seed: Seed = None, block: int = 1024):
+        self.max_steps = max_steps
+        self.n_actions = n_actions
+        self.block = block
+        self.epsilons = epsilon_schedule(np.arange(total_episodes), epsilon, max_epsilon, min_epsilon, decay_rate)
+        self._seed = seed_sequence(seed)
+        self._block_index = None
+        self._actions = None
+
+    def _draw(self, b: int) -> np.ndarray:
+        ss = self._seed
+        rng = np.random.default_rng(np.random.SeedSequence(ss.entropy, spawn_key=ss.spawn_key + (b,)))
+        epsilons = self.epsilons[b * self.block:(b + 1) * self.block, None]
+        # explore when the draw is not greater than epsilon, as train_model does
+        explore = rng.random((len(epsilons), self.max_steps)) <= epsilons
+        random_actions = rng.integers(self.n_actions, size=explore.shape, dtype=np.int64)
+        return np.where(explore, random_actions, GREEDY)
+
+    def actions(self, episode: int) -> np.ndarray:
+        """(max_steps,) random action of every step of episode, GREEDY where it exploits"""
+        b, i = divmod(episode, self.block)
+        if b != self._block_index:
+            self._actions = self._draw(b)
+            self._block_index = b
+        return self._actions[i]
+
+    def epsilon(self, episode: int) -> float:
+        return float(self.epsilons[episode])
+
+    def state_dict(self) -> dict:
+        """The seed, which is all a checkpoint needs (also when it came from fresh entropy)"""
+        return {"entropy": self._seed.entropy, "spawn_key": list(self._seed.spawn_key)}
+
+    def load_state_dict(self, state: dict):
+        self._seed = np.random.SeedSequence(state["entropy"], spawn_key=tuple(state["spawn_key"]))
+        self._block_index = None
@@ -0,0 +1,203 @@
+"""Constant-memory training metrics.
+
+Instead of keeping every episode's reward and step count until training ends,
+EpisodeMetrics folds finished episodes into per-window sums (1000 episodes by
+default, as rewards_1000) held in a small ring of preallocated slots, and emits
+each window as soon as all of its episodes are in:
+
+    metrics = EpisodeMetrics(total_episodes=total_episodes, sink="training/metrics.csv")
+    ...
+    metrics.add(episode, total_rewards, step + 1, reward > 0)
+    ...
+    metrics.close()
+    rewards_1000 = metrics.totals("reward")[0]
+
+Episodes may arrive out of order (the batched trainer finishes them lane by
+lane), a window is emitted once its count is complete.
+"""
+import csv
+from os import PathLike
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+FIELDS = ["config", "window", "start_episode", "episodes", "reward", "mean_reward", "mean_steps", "win_rate"]
+
+# per-window sums, in this order
+_REWARD, _STEPS, _WINS = range(3)
+
+
+class EpisodeMetrics:
+    """Per-window reward, steps and win rate of one or several configs trained together
+    :param window: episodes per aggregate
+    :param n_configs: number of independent streams (see train_q_learning_configs)
+    :param total_episodes: episodes per config, if known; the last window is then
+        emitted as soon as it is complete even if shorter than `window`
+    :param sink: CSV path the aggregates are appended to, or a callable taking each
+        aggregate as a dict of FIELDS
+    :param keep_history: also keep the aggregates in memory for `totals`
+    :param capacity: windows per config that can be open at once, doubled when exceeded
+    """
+
+    def __init__(self, window: int = 1000, n_configs: int = 1, total_episodes: Optional[int] = None,
+                 sink: Union[str, PathLike, Callable, None] = None, keep_history: bool = True, capacity: int = 4):
+        self.window = window
+        self.n_configs = n_configs
+        self.total_episodes = total_episodes
+        self.keep_history = keep_history
+        self.history = {field: [] for field in FIELDS} if keep_history else None
+
+        self._sums = np.zeros((capacity, n_configs, 3))
+        self._counts = np.zeros((capacity, n_configs), dtype=np.int64)
+        # window held by every slot, -1 when free
+        self._slot_window = np.full((capacity, n_configs), -1, dtype=np.int64)
+
+        self._callback = None
+        self._file = None
+        if callable(sink):
+            self._callback = sink
+        elif sink is not None:
+            path = Path(sink)
+            path.parent.mkdir(exist_ok=True, parents=True)
+            new_file = not path.exists() or path.stat().st_size == 0
+            self._file = open(path, "a", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+            if new_file:
+                self._writer.writeheader()
+
+    def _expected(self, windows):
+        """Number of episodes in each window"""
+        if self.total_episodes is None:
+            return np.full_like(windows, self.window)
+        return np.minimum(self.window, self.total_episodes - windows * self.window)
+
+    def _grow(self):
+        capacity = 2 * len(self._counts)
+        sums = np.zeros((capacity,) + self._sums.shape[1:])
+        counts = np.zeros((capacity, self.n_configs), dtype=np.int64)
+        slot_window = np.full((capacity, self.n_configs), -1, dtype=np.int64)
+        old_slot, config = np.nonzero(self._slot_window >= 0)
+        windows = self._slot_window[old_slot, config]
+        new_slot = windows % capacity
+        sums[new_slot, config] = self._sums[old_slot, config]
+        counts[new_slot, config] = self._counts[old_slot, config]
+        slot_window[new_slot, config] = windows
+        self._sums, self._counts, self._slot_window = sums, counts, slot_window
+
+    def add(self, episodes, reward, steps, won, config=0):
+        """Records finished episodes, scalars or arrays of equal length
+        :param episodes: index of each episode (within its config)
+        :param reward: total reward of each episode
+        :param steps: steps taken in each episode
+        :param won: whether each episode reached the goal
+        :param config: config of each episode
+        """
+        episodes = np.atleast_1d(np.asarray(episodes, dtype=np.int64))
+        config = np.broadcast_to(np.asarray(config, dtype=np.int64), episodes.shape)
+        windows = episodes // self.window
+        while True:
+            slot = windows % len(self._counts)
+            occupant = self._slot_window[slot, config]
+            # every (slot, config) must hold a single window, whether open already or new in this batch
+            cells = np.unique(np.stack([slot * self.n_configs + config, windows]), axis=1)[0]
+            if not ((occupant >= 0) & (occupant != windows)).any() and len(np.unique(cells)) == len(cells):
+                break
+            self._grow()
+        self._slot_window[slot, config] = windows
+
+        n_cells = self._counts.size
+        flat = slot * self.n_configs + config
+        self._counts.reshape(-1)[:] += np.bincount(flat, minlength=n_cells)
+        values = np.broadcast_arrays(reward, steps, won, episodes)[:3]
+        for field, value in zip((_REWARD, _STEPS, _WINS), values):
+            self._sums[..., field].reshape(-1)[:] += np.bincount(
+                flat, weights=np.asarray(value, dtype=np.float64), minlength=n_cells
+            )
+
+        touched = np.unique(flat)
+        slot, config = np.divmod(touched, self.n_configs)
+        full = self._counts[slot, config] >= self._expected(self._slot_window[slot, config])
+        for s, c in zip(slot[full], config[full]):
+            self._emit(s, c)
+
+    def _emit(self, slot, config):
+        window = int(self._slot_window[slot, config])
+        count = int(self._counts[slot, config])
+        reward, steps, wins = self._sums[slot, config]
+        row = {
+            "config": int(config),
+            "window": window,
+            "start_episode": window * self.window,
+            "episodes": count,
+            "reward": float(reward),
+            "mean_reward": float(reward / count),
+            "mean_steps": float(steps / count),
+            "win_rate": float(wins / count),
+        }
+        self._sums[slot, config] = 0
+        self._counts[slot, config] = 0
+        self._slot_window[slot, config] = -1
+
+        if self.keep_history:
+            for field in FIELDS:
+                self.history[field].append(row[field])
+        if self._callback is not None:
+            self._callback(row)
+        if self._file is not None:
+            self._writer.writerow(row)
+            self._file.flush()
+
+    def flush(self):
+        """Emits every window that still has episodes, complete or not, in window order"""
+        slot, config = np.nonzero(self._slot_window >= 0)
+        order = np.lexsort((config, self._slot_window[slot, config]))
+        for s, c in zip(slot[order], config[order]):
+            self._emit(s, c)
+
+    def close(self):
+        """Flushes the open windows and closes the CSV sink"""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def state_dict(self) -> dict:
+        """Open windows, history and sink position, for checkpoints"""
+        state = {
+            "sums": self._sums.copy(),
+            "counts": self._counts.copy(),
+            "slot_window": self._slot_window.copy(),
+            "sink_offset": None if self._file is None else self._file.tell(),
+        }
+        if self.keep_history:
+            state.update({f"history_{field}": np.asarray(self.history[field]) for field in FIELDS})
+        return state
+
+    def load_state_dict(self, state: dict):
+        """Restores a state_dict. A CSV sink is cut back to where it was when the state
+        was taken, so windows emitted again after resuming are not written twice
+        (a callback sink does see them again).
+        """
+        self._sums = np.array(state["sums"], dtype=np.float64)
+        self._counts = np.array(state["counts"], dtype=np.int64)
+        self._slot_window = np.array(state["slot_window"], dtype=np.int64)
+        if self.keep_history:
+            self.history = {field: np.asarray(state[f"history_{field}"]).tolist() for field in FIELDS}
+        if self._file is not None and state["sink_offset"] is not None:
+            self._file.truncate(state["sink_offset"])
+            self._file.seek(state["sink_offset"])
+
+    def totals(self, field: str = "reward") -> np.ndarray:
+        """(n_configs, n_windows) array of one FIELDS entry from the kept history, in
+        window order; "reward" gives rewards_1000 (NaN for windows not emitted yet)
+        """
+        if not self.keep_history:
+            raise ValueError("EpisodeMetrics was created with keep_history=False")
+        windows = np.asarray(self.history["window"], dtype=np.int64)
+        n_windows = windows.max() + 1 if windows.size else 0
+        if self.total_episodes is not None:
+            n_windows = max(n_windows, -(-self.total_episodes // self.window))
+        out = np.full((self.n_configs, n_windows), np.nan)
+        out[np.asarray(self.history["config"], dtype=np.int64), windows] = self.history[field]
+        return out
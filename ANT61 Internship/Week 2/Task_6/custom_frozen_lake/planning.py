@@ -0,0 +1,312 @@
+"""Exact planning on the FrozenLakeEnv transition model.
+
+Value iteration and policy iteration work directly on the TransitionModel
+arrays (`env.transitions`, or `build_transition_model` of a whole batch of
+maps at once), so a fixed map is solved in milliseconds instead of millions
+of sampled episodes. The results serve as ground truth for learned Q-tables:
+
+    model = build_transition_model(descs, is_slippery=True)    # (N, nrow, ncol) maps
+    solution = value_iteration(model, gamma=0.99)
+    print(solution.converged.all(), solution.iterations)
+
+    # chance that a learned qtable and the best possible policy reach the goal in 100 steps
+    score = score_qtable(qtable, descs, max_steps=100)
+
+Lakes too big for the dense arrays (512x512 and up) are planned on the
+scipy.sparse export instead, with sparse_value_iteration or
+sparse_policy_iteration:
+
+    model = build_sparse_model(generate_random_maps(1, 1024, method="carve")[0], is_slippery=True)
+    solution = sparse_value_iteration(model, gamma=0.99)  # 1M states, 37 full backups
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from custom_frozen_lake.envs.custom_frozen_lake_env import (
+    DIR_STATE_FLAG,
+    TransitionModel,
+    build_transition_model,
+    observation_tables,
+)
+from custom_frozen_lake.envs.map_generation import TILE_S, as_tile_array
+from custom_frozen_lake.envs.sparse_model import SparseModel
+
+
+class Solution(NamedTuple):
+    """Result of value_iteration or policy_iteration, with a leading map axis for batches"""
+
+    values: np.ndarray  # (nS,) state values
+    q: np.ndarray  # (nS, nA) action values
+    policy: np.ndarray  # (nS,) greedy action of every state
+    iterations: np.ndarray  # () sweeps (value iteration) or improvement steps (policy iteration) until convergence
+    residual: np.ndarray  # () last max |change| of the values, or number of policy changes
+    converged: np.ndarray  # () bool
+
+
+def _as_batch(model: TransitionModel):
+    """Adds a map axis to the model of a single map, returns (model, single)"""
+    single = model.next_state.ndim == 3
+    if single:
+        model = TransitionModel(*(x[None] for x in model))
+    return model, single
+
+
+def _unbatch(solution: Solution, single: bool) -> Solution:
+    return Solution(*(x[0] for x in solution)) if single else solution
+
+
+class _Lookahead(NamedTuple):
+    """The parts of a batched TransitionModel a Bellman backup needs, precomputed once"""
+
+    expected_reward: np.ndarray  # (N, nS, nA)
+    weight: np.ndarray  # (N, nS, nA, k) prob of outcomes that continue the episode
+    flat_next: np.ndarray  # (N, nS, nA, k) next state + map offset, indexes values.ravel()
+
+    @classmethod
+    def of(cls, model: TransitionModel):
+        N, nS = model.next_state.shape[:2]
+        offset = (np.arange(N) * nS)[:, None, None, None]
+        return cls(
+            np.sum(model.prob * model.reward, axis=-1),
+            np.where(model.done, 0.0, model.prob),
+            model.next_state + offset,
+        )
+
+    def __call__(self, values: np.ndarray, gamma: float) -> np.ndarray:
+        """(N, nS, nA) Q = sum_k p * (r + gamma * V(s')), episodes end on done"""
+        return self.expected_reward + gamma * np.sum(self.weight * values.ravel()[self.flat_next], axis=-1)
+
+    def subset(self, maps):
+        nS = self.flat_next.shape[1]
+        offset = ((np.arange(len(maps)) - maps) * nS)[:, None, None, None]
+        return _Lookahead(self.expected_reward[maps], self.weight[maps], self.flat_next[maps] + offset)
+
+
+def backup(model: TransitionModel, values: np.ndarray, gamma: float) -> np.ndarray:
+    """(N, nS, nA) one-step lookahead Q = sum_k p * (r + gamma * V(s')), episodes end on done
+    :param model: batched TransitionModel
+    :param values: (N, nS) state values
+    """
+    return _Lookahead.of(model)(values, gamma)
+
+
+def value_iteration(model: TransitionModel, gamma: float = 0.99, tol: float = 1e-8,
+                    max_iter: int = 100000, values: Optional[np.ndarray] = None) -> Solution:
+    """Optimal values and policy of one map or of a batch of maps
+    :param model: TransitionModel of one map, or of a batch of maps
+    :param gamma: discount factor
+    :param tol: a map has converged once no value changes by more than tol in a sweep
+    :param max_iter: maximum number of sweeps
+    :param values: optional starting values, zeros by default
+    """
+    model, single = _as_batch(model)
+    N, nS = model.next_state.shape[:2]
+    values = np.zeros((N, nS)) if values is None else np.array(values, dtype=np.float64).reshape(N, nS)
+    iterations = np.zeros(N, dtype=np.int64)
+    residual = np.full(N, np.inf)
+    lookahead = _Lookahead.of(model)
+    # sweep only the maps that have not converged yet
+    todo = np.arange(N)
+    sub, sub_values = lookahead, values
+    for _ in range(max_iter):
+        if not todo.size:
+            break
+        new = sub(sub_values, gamma).max(axis=2)
+        residual[todo] = np.abs(new - sub_values).max(axis=1)
+        sub_values = new
+        iterations[todo] += 1
+        keep = residual[todo] > tol
+        if not keep.all():
+            values[todo] = sub_values
+            sub, sub_values, todo = sub.subset(np.flatnonzero(keep)), sub_values[keep], todo[keep]
+    values[todo] = sub_values
+
+    q = lookahead(values, gamma)
+    solution = Solution(values, q, q.argmax(axis=2), iterations, residual, residual <= tol)
+    return _unbatch(solution, single)
+
+
+def policy_values(model: TransitionModel, policy: np.ndarray, gamma: float = 0.99) -> np.ndarray:
+    """Exact values of a deterministic policy, solving (I - gamma * P_pi) V = r_pi
+    :param model: TransitionModel of one map, or of a batch of maps
+    :param policy: (nS,) or (N, nS) action of every state
+    :param gamma: discount factor, must be < 1 unless every policy reaches G or H
+    The system is dense in nS, meant for maps of up to a few thousand states.
+    """
+    model, single = _as_batch(model)
+    N, nS, nA, k = model.next_state.shape
+    policy = np.asarray(policy).reshape(N, nS, 1, 1)
+    pick = lambda x: np.take_along_axis(x, policy, axis=2)[:, :, 0]  # (N, nS, k)
+    next_state, prob, reward, done = pick(model.next_state), pick(model.prob), pick(model.reward), pick(model.done)
+
+    r_pi = np.sum(prob * reward, axis=2)
+    # P_pi[n, s, s'] summed over the outcomes of the chosen action that continue the episode
+    rows = (np.arange(N)[:, None, None] * nS + np.arange(nS)[None, :, None]) * nS + next_state
+    p_pi = np.bincount(rows.ravel(), weights=np.where(done, 0.0, prob).ravel(), minlength=N * nS * nS)
+    system = np.eye(nS) - gamma * p_pi.reshape(N, nS, nS)
+    values = np.linalg.solve(system, r_pi[..., None])[..., 0]
+    return values[0] if single else values
+
+
+def policy_iteration(model: TransitionModel, gamma: float = 0.99, max_iter: int = 1000,
+                     policy: Optional[np.ndarray] = None) -> Solution:
+    """Optimal values and policy of one map or of a batch of maps, with exact policy evaluation
+    :param model: TransitionModel of one map, or of a batch of maps
+    :param gamma: discount factor, < 1
+    :param max_iter: maximum number of improvement steps
+    :param policy: optional starting policy, all LEFT by default
+    """
+    model, single = _as_batch(model)
+    N, nS = model.next_state.shape[:2]
+    policy = np.zeros((N, nS), dtype=np.int64) if policy is None else np.array(policy, dtype=np.int64).reshape(N, nS)
+    iterations = np.zeros(N, dtype=np.int64)
+    changed = np.full(N, nS)
+    for _ in range(max_iter):
+        todo = np.flatnonzero(changed)
+        if not todo.size:
+            break
+        sub = TransitionModel(*(x[todo] for x in model))
+        q = backup(sub, policy_values(sub, policy[todo], gamma), gamma)
+        current = np.take_along_axis(q, policy[todo][..., None], axis=2)[..., 0]
+        # only switch action on a strict improvement, so ties cannot make it cycle
+        better = q.max(axis=2) > current + 1e-12 * np.maximum(1.0, np.abs(current))
+        policy[todo] = np.where(better, q.argmax(axis=2), policy[todo])
+        changed[todo] = better.sum(axis=1)
+        iterations[todo] += 1
+
+    values = policy_values(model, policy, gamma)
+    q = backup(model, values, gamma)
+    solution = Solution(values, q, policy, iterations, changed, changed == 0)
+    return _unbatch(solution, single)
+
+
+def success_probability(model: TransitionModel, policy: Optional[np.ndarray] = None,
+                        max_steps: int = 100) -> np.ndarray:
+    """Probability of reaching the goal within max_steps from every state
+    :param model: TransitionModel of one map, or of a batch of maps
+    :param policy: (nS,) or (N, nS) action of every state; None for the best any
+        (even step-dependent) policy can do, an upper bound for learned policies
+    :param max_steps: episode length, as the max_steps of train_model/test_model
+    :return: (nS,) or (N, nS) success probabilities
+    """
+    model, single = _as_batch(model)
+    N, nS, nA, k = model.next_state.shape
+    # the goal is the only transition with a positive reward
+    lookahead = _Lookahead.of(model._replace(reward=(model.reward > 0).astype(np.float64)))
+    values = np.zeros((N, nS))
+    if policy is not None:
+        policy = np.asarray(policy).reshape(N, nS, 1)
+    for _ in range(max_steps):
+        q = lookahead(values, 1.0)
+        values = q.max(axis=2) if policy is None else np.take_along_axis(q, policy, axis=2)[..., 0]
+    return values[0] if single else values
+
+
+def qtable_policy(qtable: np.ndarray, descs) -> np.ndarray:
+    """Greedy action of a FrozenLakeEnv qtable in every state of one map or of a batch of maps"""
+    obs = observation_tables(descs)
+    if not DIR_STATE_FLAG:
+        obs = obs[0]
+    return np.argmax(qtable[obs], axis=-1)
+
+
+def score_qtable(qtable: np.ndarray, descs, is_slippery: bool = True, max_steps: int = 100) -> dict:
+    """Compares the greedy policy of a learned qtable with the optimal one on a set of maps
+    :param qtable: Q-table indexed by the FrozenLakeEnv observation plus the action
+    :param descs: one map or a (N, nrow, ncol) batch of maps
+    :param is_slippery: whether the maps are played slippery
+    :param max_steps: episode length
+    :return: per map success probability from the start tile of the qtable's policy
+        ("learned") and of the best possible one ("optimal"), plus their means
+    """
+    tiles = as_tile_array(descs)
+    if tiles.ndim == 2:
+        tiles = tiles[None]
+    model = build_transition_model(tiles, is_slippery)
+    start = np.argmax(tiles.reshape(len(tiles), -1) == TILE_S, axis=1)[:, None]
+    learned = success_probability(model, qtable_policy(qtable, tiles), max_steps)
+    optimal = success_probability(model, None, max_steps)
+    learned = np.take_along_axis(learned, start, axis=1)[:, 0]
+    optimal = np.take_along_axis(optimal, start, axis=1)[:, 0]
+    return {
+        "learned": learned,
+        "optimal": optimal,
+        "learned_mean": float(learned.mean()),
+        "optimal_mean": float(optimal.mean()),
+        # share of the achievable success rate the qtable reaches
+        "ratio": float(learned.sum() / max(optimal.sum(), 1e-12)),
+    }
+
+
+def sparse_value_iteration(model: SparseModel, gamma: float = 0.99, tol: float = 1e-8,
+                           max_iter: int = 100000, eval_sweeps: int = 32,
+                           values: Optional[np.ndarray] = None) -> Solution:
+    """value_iteration on a SparseModel of one map, with Bellman backups as sparse mat-vec products
+    :param model: SparseModel, see FrozenLakeEnv.sparse_model or build_sparse_model
+    :param eval_sweeps: cheap sweeps with the current greedy policy between two full
+        backups (modified policy iteration), each one a product with an nS x nS
+        matrix instead of the nA * nS x nS one; 0 for plain value iteration.
+        On a 1024x1024 carve lake 32 sweeps converged in 37 full backups and about a
+        quarter of the time of plain value iteration (906 backups).
+    :param max_iter: maximum number of full backups
+    The other parameters are those of value_iteration, convergence is checked on full backups.
+    """
+    nA, nS = model.reward.shape
+    stacked = model.stacked
+    states = np.arange(nS)
+    values = np.zeros(nS) if values is None else np.array(values, dtype=np.float64)
+    residual = np.inf
+    iterations = 0
+    while iterations < max_iter:
+        q = model.reward + gamma * (stacked @ values).reshape(nA, nS)
+        new = q.max(axis=0)
+        residual = np.abs(new - values).max()
+        values = new
+        iterations += 1
+        if residual <= tol:
+            break
+        if eval_sweeps:
+            policy = q.argmax(axis=0)
+            p_pi, r_pi = stacked[policy * nS + states], model.reward[policy, states]
+            for _ in range(eval_sweeps):
+                values = r_pi + gamma * (p_pi @ values)
+
+    q = (model.reward + gamma * (stacked @ values).reshape(nA, nS)).T
+    return Solution(values, q, q.argmax(axis=1), np.array(iterations), np.array(residual), np.array(residual <= tol))
+
+
+def sparse_policy_iteration(model: SparseModel, gamma: float = 0.99, max_iter: int = 1000,
+                            policy: Optional[np.ndarray] = None) -> Solution:
+    """policy_iteration on a SparseModel of one map, each policy is evaluated exactly
+    with a sparse direct solve. It needs about ten solves, so past a few hundred
+    thousand states sparse_value_iteration is faster.
+    :param model: SparseModel, see FrozenLakeEnv.sparse_model or build_sparse_model
+    The other parameters are those of policy_iteration.
+    """
+    from scipy import sparse
+    from scipy.sparse.linalg import spsolve
+
+    nA, nS = model.reward.shape
+    stacked = model.stacked
+    states = np.arange(nS)
+    identity = sparse.identity(nS, format="csr")
+    policy = np.zeros(nS, dtype=np.int64) if policy is None else np.array(policy, dtype=np.int64)
+    changed = nS
+    iterations = 0
+    while iterations < max_iter and changed:
+        # rows of the chosen action of every state
+        p_pi = stacked[policy * nS + states]
+        values = spsolve((identity - gamma * p_pi).tocsc(), model.reward[policy, states])
+        q = model.reward + gamma * (stacked @ values).reshape(nA, nS)
+        current = q[policy, states]
+        # only switch action on a strict improvement, so ties cannot make it cycle
+        better = q.max(axis=0) > current + 1e-12 * np.maximum(1.0, np.abs(current))
+        policy = np.where(better, q.argmax(axis=0), policy)
+        changed = int(better.sum())
+        iterations += 1
+
+    p_pi = stacked[policy * nS + states]
+    values = spsolve((identity - gamma * p_pi).tocsc(), model.reward[policy, states])
+    q = (model.reward + gamma * (stacked @ values).reshape(nA, nS)).T
+    return Solution(values, q, policy, np.array(iterations), np.array(changed), np.array(changed == 0))
@@ -0,0 +1,167 @@
+"""Opt-in phase timers and counters for the env and the training loops.
+
+Nothing here runs unless a Profiler is passed in: FrozenLakeEnv only binds a
+timed step on the instance while profiling is enabled, and the trainers time
+their phases through `null_phase` otherwise, so an unprofiled run pays at most
+an empty `with` per batched step.
+
+    profiler = Profiler()
+    profiler.attach(env)                  # env.step, set_map and the gym wrappers
+    train_q_learning(vec_env, qtable, ..., profiler=profiler)
+    print(profiler.report())
+    profiler.write_collapsed("training/profile.folded")
+
+Phases nest, a phase entered inside another is recorded under the "outer;inner"
+path. `write_collapsed` writes the self time of every path in the collapsed
+stack format read by flamegraph.pl, speedscope and inferno.
+"""
+from contextlib import nullcontext
+from pathlib import Path
+from time import perf_counter_ns
+
+_NULL = nullcontext()
+
+
+def null_phase(name):
+    """Stand-in for Profiler.phase when profiling is off"""
+    return _NULL
+
+
+class _Phase:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.push(self.name)
+
+    def __exit__(self, *exc):
+        self.profiler.pop()
+
+
+class Profiler:
+    """Inclusive time and call count of every phase path, plus free-form counters"""
+
+    def __init__(self):
+        self.time_ns = {}
+        self.calls = {}
+        self.counters = {}
+        self._phases = {}
+        self._keys = []
+        self._starts = []
+        self._attached = []
+
+    def phase(self, name) -> _Phase:
+        """Context manager timing one phase, e.g. `with profiler.phase("q_update"):`"""
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def push(self, name):
+        """Enters a phase, for code that cannot be indented into a `with` block"""
+        self._keys.append(f"{self._keys[-1]};{name}" if self._keys else name)
+        self._starts.append(perf_counter_ns())
+
+    def pop(self):
+        """Leaves the innermost phase"""
+        elapsed = perf_counter_ns() - self._starts.pop()
+        key = self._keys.pop()
+        self.time_ns[key] = self.time_ns.get(key, 0) + elapsed
+        self.calls[key] = self.calls.get(key, 0) + 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed(self, fn, name=None):
+        """fn wrapped in a phase named after it"""
+        phase = self.phase(name or fn.__name__)
+
+        def wrapper(*args, **kwargs):
+            with phase:
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def attach(self, env):
+        """Times a (possibly gym.make wrapped) FrozenLakeEnv: step and reset through the
+        wrapper stack, and inside it the env's own step ("env.step") and set_map
+        """
+        inner = env.unwrapped
+        inner.enable_profiling(self)
+        patched = [(inner, "set_map")]
+        inner.set_map = self.timed(inner.set_map, "set_map")
+        if env is not inner:
+            # the self time of these is what the wrappers add
+            env.step = self.timed(env.step, "wrappers.step")
+            env.reset = self.timed(env.reset, "wrappers.reset")
+            patched += [(env, "step"), (env, "reset")]
+        self._attached.append((inner, patched))
+
+    def detach(self, env):
+        """Undoes attach"""
+        inner = env.unwrapped
+        for i, (attached, patched) in enumerate(self._attached):
+            if attached is inner:
+                for obj, attr in patched:
+                    del obj.__dict__[attr]
+                inner.enable_profiling(None)
+                del self._attached[i]
+                return
+
+    def reset(self):
+        self.time_ns.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    def self_time_ns(self) -> dict:
+        """Time of every path minus that of the phases directly inside it"""
+        own = dict(self.time_ns)
+        for key, ns in self.time_ns.items():
+            parent, _, _ = key.rpartition(";")
+            if parent in own:
+                own[parent] -= ns
+        return own
+
+    def summary(self) -> list:
+        """One row per phase path, in path order"""
+        own = self.self_time_ns()
+        roots = sum(ns for key, ns in self.time_ns.items() if ";" not in key) or 1
+        rows = []
+        for key in sorted(self.time_ns):
+            calls = self.calls[key]
+            rows.append({
+                "phase": key,
+                "calls": calls,
+                "total_s": self.time_ns[key] / 1e9,
+                "self_s": own[key] / 1e9,
+                "mean_us": self.time_ns[key] / calls / 1e3,
+                "share": self.time_ns[key] / roots,
+            })
+        return rows
+
+    def report(self) -> str:
+        """Human-readable table of summary() and the counters"""
+        lines = [f"{'phase':<44} {'calls':>10} {'total s':>9} {'self s':>9} {'mean us':>9} {'share':>6}"]
+        for row in self.summary():
+            *parents, name = row["phase"].split(";")
+            label = "  " * len(parents) + name
+            lines.append(
+                f"{label:<44} {row['calls']:>10} {row['total_s']:>9.3f} {row['self_s']:>9.3f}"
+                f" {row['mean_us']:>9.2f} {row['share']:>6.1%}"
+            )
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<44} {value:>10}")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path, unit_ns: int = 1000):
+        """Writes "outer;inner self_time" lines (microseconds by default) for flamegraph tools"""
+        path = Path(path)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        with open(path, "w") as f:
+            for key, ns in sorted(self.self_time_ns().items()):
+                if ns // unit_ns > 0:
+                    f.write(f"{key} {ns // unit_ns}\n")
+        return path
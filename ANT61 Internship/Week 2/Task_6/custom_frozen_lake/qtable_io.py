@@ -0,0 +1,66 @@
+"""Q-table files for evaluation.
+
+Q-tables are saved as `.npy` and loaded memory-mapped read-only, so opening
+even a large table (the 20**4 x 2 discretised CartPole table, say) costs no
+parsing or copying, and every evaluation worker process that maps the same
+file shares one copy of it in the page cache. Tables saved as text (the
+`np.savetxt` CSVs of Frozen_Lake.ipynb) are converted to a `.npy` next to them
+the first time they are loaded.
+
+    save_qtable("training/qtable.npy", qtable)
+    qtable = load_qtable("training/qtable.npy")   # read-only np.memmap
+"""
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+TEXT_SUFFIXES = (".csv", ".txt")
+
+
+def _npy_path(path: Path) -> Path:
+    """path with ".npy" appended unless it already ends in it; not with_suffix, which
+    would cut dotted names such as "1500000_0.0_1.0_0.1" at their last dot
+    """
+    return path if path.suffix == ".npy" else path.with_name(path.name + ".npy")
+
+
+def save_qtable(path, qtable: np.ndarray) -> Path:
+    """Writes qtable to a .npy file atomically, so readers never map a half-written table"""
+    path = _npy_path(Path(path))
+    path.parent.mkdir(exist_ok=True, parents=True)
+    # per process temporary name, several workers may convert the same table at once
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(qtable))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def load_qtable(path, mmap: bool = True, delimiter: str = ",") -> np.ndarray:
+    """Opens a saved Q-table read-only
+    :param path: .npy file (the extension may be left out, as for save_qtable), or a
+        .csv/.txt table written with np.savetxt
+    :param mmap: map the file instead of reading it; False returns an in-memory copy
+    :param delimiter: delimiter of text tables
+    """
+    path = Path(path)
+    if path.suffix in TEXT_SUFFIXES:
+        npy = _npy_path(path.with_name(path.stem))
+        if not npy.exists() or npy.stat().st_mtime < path.stat().st_mtime:
+            save_qtable(npy, np.loadtxt(path, delimiter=delimiter))
+        path = npy
+    else:
+        path = _npy_path(path)
+    if not mmap:
+        return np.load(path)
+    return np.load(path, mmap_mode="r")
+
+
+@lru_cache(maxsize=None)
+def shared_qtable(path) -> np.ndarray:
+    """load_qtable mapped once per process, for evaluation workers handed a path"""
+    return load_qtable(path)
@@ -0,0 +1,103 @@
+"""Random number streams for the envs and trainers.
+
+Every source of randomness derives from one np.random.SeedSequence: a run's
+seed is split with `spawn` into independent children for its worker processes,
+and each worker's into children for map generation, the env and exploration.
+Numbers are drawn in blocks rather than one call per step:
+
+    maps_seed, env_seed, explore_seed = seed_sequence(seed).spawn(3)
+    slips = LaneRandom(env_seed, num_envs)       # one stream per lane
+    u = slips.random()                           # (num_envs,) uniforms, refilled every 256 steps
+
+A lane's numbers only depend on the seed and the lane index, not on how many
+lanes there are or on what the other lanes do.
+"""
+from typing import Union
+
+import numpy as np
+
+Seed = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+
+def seed_sequence(seed: Seed = None) -> np.random.SeedSequence:
+    """SeedSequence of an int (or None for fresh entropy), a SeedSequence itself, or
+    one seeded from a Generator's next draws
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(seed.integers(2**63, size=4))
+    return np.random.SeedSequence(seed)
+
+
+def spawn_generators(seed: Seed, n: int) -> list:
+    """n independent Generators, e.g. one per worker process"""
+    return [np.random.default_rng(child) for child in seed_sequence(seed).spawn(n)]
+
+
+class BlockRandom:
+    """Uniform draws of a fixed shape, taken from one Generator `block` draws at a time
+    :param rng: Generator, or a seed for one
+    :param shape: shape of every draw
+    :param block: draws fetched per refill
+    """
+
+    def __init__(self, rng: Seed = None, shape=(), block: int = 1024):
+        self.rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(seed_sequence(rng))
+        self.shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        self.block = block
+        self._buffer = None
+        self._pos = block
+
+    def _refill(self) -> np.ndarray:
+        return self.rng.random((self.block,) + self.shape)
+
+    def random(self):
+        """Next draw of uniforms in [0, 1)"""
+        if self._pos == self.block:
+            self._buffer = self._refill()
+            self._pos = 0
+        self._pos += 1
+        return self._buffer[self._pos - 1]
+
+    def integers(self, high: int):
+        """Next draw of integers in [0, high)"""
+        return (self.random() * high).astype(np.int64)
+
+    def state_dict(self) -> dict:
+        return {"rng": self.rng.bit_generator.state, "buffer": self._buffer, "pos": self._pos}
+
+    def load_state_dict(self, state: dict):
+        self.rng.bit_generator.state = state["rng"]
+        self._buffer = None if state["buffer"] is None else np.array(state["buffer"])
+        self._pos = int(state["pos"])
+
+
+class LaneRandom(BlockRandom):
+    """BlockRandom with an independent Generator per lane, so draws have shape
+    (num_lanes, *shape) and lane i only ever sees the i-th stream spawned from seed
+    """
+
+    def __init__(self, seed: Seed, num_lanes: int, shape=(), block: int = 256):
+        self.rng = None
+        self.lanes = spawn_generators(seed, num_lanes)
+        self.shape = (num_lanes,) + ((shape,) if isinstance(shape, int) else tuple(shape))
+        self.block = block
+        self._buffer = None
+        self._pos = block
+
+    def _refill(self) -> np.ndarray:
+        by_lane = np.empty((len(self.lanes), self.block) + self.shape[1:])
+        for lane, out in zip(self.lanes, by_lane):
+            lane.random(out=out)
+        # step major, so every draw is one contiguous row
+        return np.ascontiguousarray(np.swapaxes(by_lane, 0, 1))
+
+    def state_dict(self) -> dict:
+        return {"lanes": [lane.bit_generator.state for lane in self.lanes], "buffer": self._buffer, "pos": self._pos}
+
+    def load_state_dict(self, state: dict):
+        for lane, lane_state in zip(self.lanes, state["lanes"]):
+            lane.bit_generator.state = lane_state
+        self._buffer = None if state["buffer"] is None else np.array(state["buffer"])
+        self._pos = int(state["pos"])
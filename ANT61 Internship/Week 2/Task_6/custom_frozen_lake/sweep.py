@@ -0,0 +1,163 @@
+"""Parallel (learning_rate, gamma) sweeps for train_q_learning.
+
+Every cell of the grid is trained in its own worker process with an
+independent seed spawned from one SeedSequence, and its result is appended
+to a CSV as soon as it finishes. Running the same sweep again on that CSV
+only trains the missing cells, so an interrupted sweep picks up where it
+stopped.
+
+    grid = run_sweep("tune_hyperparam/sweep.csv", np.linspace(0.1, 0.9, 10), np.linspace(0.1, 0.9, 10),
+                     total_episodes=20000, max_steps=100, frozen_p=0.8)
+
+run_lockstep_sweep instead trains the whole grid as one stack of qtables in a
+single process (see train_q_learning_configs), which is usually faster than
+the process pool for small tables.
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from custom_frozen_lake.envs.vector_frozen_lake_env import VectorFrozenLakeEnv
+from custom_frozen_lake.training import train_q_learning, train_q_learning_configs
+
+FIELDS = ["cell", "learning_rate", "gamma", "reward", "seconds"]
+
+
+def _run_cell(cell: int, learning_rate: float, gamma: float, seed: np.random.SeedSequence,
+              qtable_shape: tuple, num_envs: int, env_kwargs: dict, train_kwargs: dict) -> dict:
+    """Trains one grid cell from scratch, runs in a worker process"""
+    start = time.perf_counter()
+    env_seed, train_seed = seed.spawn(2)
+    env = VectorFrozenLakeEnv(num_envs=num_envs, seed=env_seed, **env_kwargs)
+    qtable = np.zeros(qtable_shape)
+    _, rewards_1000 = train_q_learning(env, qtable, learning_rate=learning_rate, gamma=gamma,
+                                       seed=train_seed, **train_kwargs)
+    return {
+        "cell": cell,
+        "learning_rate": learning_rate,
+        "gamma": gamma,
+        # reward over the final 1000 episodes, as in tune_hyperparam
+        "reward": float(rewards_1000[-1]),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def print_progress(done: int, total: int, row: dict):
+    """Default progress report, one line per finished cell"""
+    print(f"[{done}/{total}] learning_rate={row['learning_rate']:.4g} gamma={row['gamma']:.4g} "
+          f"reward={row['reward']:.1f} ({row['seconds']:.0f}s)", flush=True)
+
+
+def load_sweep(path, learning_rates, gammas) -> np.ndarray:
+    """Reads a sweep CSV back into a (len(learning_rates), len(gammas)) reward grid, NaN for missing cells.
+    Rows are matched to the grid by their (learning_rate, gamma), and a ValueError is
+    raised for a row that is not in the grid or was written at another cell index,
+    i.e. a CSV from a different sweep.
+    """
+    grid = np.full((len(learning_rates), len(gammas)), np.nan)
+    path = Path(path)
+    if not path.exists():
+        return grid
+    cells = {(float(lr), float(g)): (i, j) for i, lr in enumerate(learning_rates) for j, g in enumerate(gammas)}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            key = (float(row["learning_rate"]), float(row["gamma"]))
+            if key not in cells:
+                raise ValueError(f"{path} has learning_rate={key[0]} gamma={key[1]}, which is not in the grid")
+            i, j = cells[key]
+            # the cell index picks the seed, a mismatch means the grid has changed since
+            if int(row["cell"]) != i * len(gammas) + j:
+                raise ValueError(f"{path} has learning_rate={key[0]} gamma={key[1]} as cell {row['cell']}, "
+                                 f"not {i * len(gammas) + j} as in this grid")
+            grid[i, j] = float(row["reward"])
+    return grid
+
+
+def run_sweep(path, learning_rates, gammas, qtable_shape: tuple = (16, 4, 4), num_envs: int = 1,
+              processes: Optional[int] = None, seed: Optional[int] = 0, env_kwargs: Optional[dict] = None,
+              progress: Optional[Callable] = print_progress, **train_kwargs) -> np.ndarray:
+    """Trains every (learning_rate, gamma) pair and returns the reward grid
+    :param path: CSV the results are streamed to, cells already in it are skipped; it
+        must come from a sweep over the same grid (see load_sweep)
+    :param learning_rates: values of the first grid axis
+    :param gammas: values of the second grid axis
+    :param qtable_shape: shape of the zero qtable every cell starts from
+    :param num_envs: lanes of the VectorFrozenLakeEnv of each cell. With one lane a cell
+        learns like train_model, one update per step; with more, lanes hitting the same
+        entry average their updates, which changes the effective learning rate, so the
+        best values found only hold for training with the same number of lanes
+    :param processes: worker processes, defaults to the number of CPUs; 1 runs in this process
+    :param seed: root seed, cell i always gets the i-th spawned child so results do not
+        depend on the number of workers or on resuming
+    :param env_kwargs: extra VectorFrozenLakeEnv arguments (map_size, map_name, is_slippery, ...)
+    :param progress: called as progress(done, total, row) after every cell, None to disable
+    :param train_kwargs: remaining train_q_learning arguments (total_episodes, frozen_p, decay_rate, ...)
+    """
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    env_kwargs = {} if env_kwargs is None else env_kwargs
+    seeds = np.random.SeedSequence(seed).spawn(len(learning_rates) * len(gammas))
+
+    finished = ~np.isnan(load_sweep(path, learning_rates, gammas)).ravel()
+    todo = [
+        (i * len(gammas) + j, float(lr), float(g))
+        for i, lr in enumerate(learning_rates)
+        for j, g in enumerate(gammas)
+        if not finished[i * len(gammas) + j]
+    ]
+    total = len(seeds)
+    done = total - len(todo)
+
+    new_file = not path.exists() or path.stat().st_size == 0
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+
+        def record(row):
+            nonlocal done
+            writer.writerow(row)
+            f.flush()
+            os.fsync(f.fileno())
+            done += 1
+            if progress is not None:
+                progress(done, total, row)
+
+        args = [(cell, lr, g, seeds[cell], qtable_shape, num_envs, env_kwargs, train_kwargs)
+                for cell, lr, g in todo]
+        if processes == 1:
+            for a in args:
+                record(_run_cell(*a))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futures = [pool.submit(_run_cell, *a) for a in args]
+                for future in as_completed(futures):
+                    record(future.result())
+
+    return load_sweep(path, learning_rates, gammas)
+
+
+def run_lockstep_sweep(learning_rates, gammas, qtable_shape: tuple = (16, 4, 4), lanes_per_config: int = 64,
+                       seed: Optional[int] = 0, env_kwargs: Optional[dict] = None, **train_kwargs) -> np.ndarray:
+    """Trains every (learning_rate, gamma) pair in lockstep and returns the reward grid
+    :param lanes_per_config: env lanes (parallel episodes) given to each grid cell; as
+        with run_sweep's num_envs, the results apply to training with this many lanes
+    :param train_kwargs: remaining train_q_learning_configs arguments, epsilon schedule
+        parameters may be (len(learning_rates) * len(gammas),) arrays in grid order
+    The other parameters are those of run_sweep.
+    """
+    env_kwargs = {} if env_kwargs is None else env_kwargs
+    env_seed, train_seed = np.random.SeedSequence(seed).spawn(2)
+    lr, g = np.meshgrid(learning_rates, gammas, indexing="ij")
+    env = VectorFrozenLakeEnv(num_envs=lr.size * lanes_per_config,
+                              seed=env_seed, **env_kwargs)
+    qtables = np.zeros((lr.size,) + tuple(qtable_shape))
+    _, rewards_1000 = train_q_learning_configs(env, qtables, learning_rate=lr.ravel(), gamma=g.ravel(),
+                                               seed=train_seed, **train_kwargs)
+    # reward over the final 1000 episodes, as in tune_hyperparam
+    return rewards_1000[:, -1].reshape(lr.shape)
@@ -0,0 +1,247 @@
+"""Batched epsilon-greedy Q-learning over VectorFrozenLakeEnv.
+
+`train_q_learning` is a drop-in replacement for the `train_model` loops in the
+notebooks: it takes a qtable and the same hyperparameters and returns
+`(qtable, rewards_1000)`, but plays `env.num_envs` episodes at a time and does
+every action choice, env step and Q update as one array operation over lanes.
+
+    env = VectorFrozenLakeEnv(num_envs=1024, map_size=8, frozen_p=0.8)
+    qtable = np.zeros((16, 4, 4))
+    qtable, rewards_1000 = train_q_learning(env, qtable, total_episodes=1_500_000,
+                                            learning_rate=0.1, gamma=0.6667, frozen_p=0.8)
+
+For gym's FrozenLake8x8 (as in Frozen_Lake.ipynb) use a position observation:
+
+    env = VectorFrozenLakeEnv(num_envs=256, map_name="8x8", is_slippery=False,
+                              observation="position", hole_reward=0.0)
+    qtable = np.zeros((64, 4))
+"""
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from custom_frozen_lake.checkpoint import load_checkpoint, save_checkpoint
+from custom_frozen_lake.envs.map_generation import generate_random_maps
+from custom_frozen_lake.exploration import epsilon_schedule
+from custom_frozen_lake.metrics import EpisodeMetrics
+from custom_frozen_lake.profiling import null_phase
+from custom_frozen_lake.rng import LaneRandom, seed_sequence
+
+# number of random maps generated at a time when training on fresh maps
+MAP_POOL_SIZE = 1 << 14
+
+
+def _as_row(obs, obs_shape):
+    """Flat index of every lane's observation into an observation space of shape obs_shape"""
+    if not isinstance(obs, tuple):
+        return np.asarray(obs)
+    return np.ravel_multi_index(obs, obs_shape)
+
+
+def train_q_learning(env, qtable: np.ndarray, total_episodes: int = 20000, learning_rate: float = 0.6,
+                     max_steps: int = 200, gamma: float = 0.6, epsilon: float = 1, max_epsilon: float = 1,
+                     min_epsilon: float = 0, decay_rate: float = 0.00005, frozen_p: Optional[float] = None,
+                     map_bank: Optional[np.ndarray] = None, seed: Optional[int] = None,
+                     metrics: Optional[EpisodeMetrics] = None, checkpoint=None,
+                     checkpoint_every: float = 300, profiler=None):
+    """Trains `qtable` in place and returns `(qtable, rewards_1000)` like train_model
+    :param env: VectorFrozenLakeEnv, its lanes play episodes in parallel
+    :param qtable: Q-table indexed by the env observation plus the action, C-contiguous
+    :param frozen_p: if set, every new episode is played on a fresh random map
+        of the env's size (train_model calls set_up(frozen_p=...) for this)
+    :param map_bank: alternatively, take the map of episode i from map_bank[i % len(map_bank)]
+    :param seed: int or SeedSequence, split into independent streams for the random maps,
+        the env's slips and the exploration draws of every lane
+    :param metrics: EpisodeMetrics every finished episode is recorded in, e.g. to stream
+        per-1000-episode reward, steps and win rate to a CSV while training runs;
+        rewards_1000 is taken from its history (None if it keeps none)
+    :param checkpoint: path of a checkpoint file (.npz), rewritten atomically every
+        checkpoint_every seconds and when training ends. If it already exists training
+        resumes from it exactly, as if it had never stopped; pass the same arguments
+        (and a fresh env and metrics) as the run that wrote it.
+    :param checkpoint_every: seconds between checkpoints
+    :param profiler: custom_frozen_lake.profiling.Profiler timing the phases of every
+        batched step (action choice, env step, Q update, finished episodes) and counting
+        lane steps and episodes; None (the default) leaves the loop uninstrumented
+    The remaining parameters are those of train_model. Lanes update the shared
+    qtable together after every step, with the TD errors of lanes that update
+    the same entry averaged; with num_envs=1 this is exactly train_model.
+    """
+    _, rewards_1000 = train_q_learning_configs(
+        env, qtable[None], total_episodes, learning_rate, max_steps, gamma, epsilon, max_epsilon,
+        min_epsilon, decay_rate, frozen_p, map_bank, seed, metrics, checkpoint, checkpoint_every, profiler,
+    )
+    return qtable, None if rewards_1000 is None else rewards_1000[0]
+
+
+def train_q_learning_configs(env, qtables: np.ndarray, total_episodes: int = 20000, learning_rate=0.6,
+                             max_steps: int = 200, gamma=0.6, epsilon=1, max_epsilon=1, min_epsilon=0,
+                             decay_rate=0.00005, frozen_p: Optional[float] = None,
+                             map_bank: Optional[np.ndarray] = None, seed: Optional[int] = None,
+                             metrics: Optional[EpisodeMetrics] = None, checkpoint=None,
+                             checkpoint_every: float = 300, profiler=None):
+    """Trains a stack of n_configs qtables in lockstep, each with its own hyperparameters
+    :param env: VectorFrozenLakeEnv whose num_envs is a multiple of n_configs, lanes are
+        split into n_configs equal consecutive groups, one per qtable
+    :param qtables: (n_configs, *obs_shape, nA) stacked Q-tables, C-contiguous, trained in place
+    :param learning_rate, gamma, epsilon, max_epsilon, min_epsilon, decay_rate: scalars
+        shared by every config, or (n_configs,) arrays
+    :param metrics: EpisodeMetrics with n_configs streams, by default one of 1000-episode windows
+    :return: (qtables, rewards_1000) with rewards_1000 of shape (n_configs, total_episodes / 1000)
+    The other parameters are those of train_q_learning, total_episodes is per config.
+    """
+    maps_seed, env_seed, explore_seed = seed_sequence(seed).spawn(3)
+    maps_rng = np.random.default_rng(maps_seed)
+    num_envs = env.num_envs
+    n_configs = len(qtables)
+    nA = qtables.shape[-1]
+    obs_shape = qtables.shape[1:-1]
+    if num_envs % n_configs:
+        raise ValueError(f"num_envs={num_envs} is not a multiple of the {n_configs} configs")
+    if not qtables.flags.c_contiguous:
+        # updates go through a flat view, which a reshape of other layouts would silently copy
+        raise ValueError("the qtable must be C-contiguous to be trained in place, see np.ascontiguousarray")
+    env.max_episode_steps = max_steps
+
+    lanes = np.arange(num_envs)
+    lanes_per_config = num_envs // n_configs
+    config = lanes // lanes_per_config
+    # per-config hyperparameters, read per lane
+    learning_rate, gamma, epsilon, max_epsilon, min_epsilon, decay_rate = (
+        np.broadcast_to(np.asarray(x, dtype=np.float64), (n_configs,))[config]
+        for x in (learning_rate, gamma, epsilon, max_epsilon, min_epsilon, decay_rate)
+    )
+    if metrics is None:
+        metrics = EpisodeMetrics(1000, n_configs, total_episodes)
+    # per lane (explore?, random action) uniforms, drawn a block of steps at a time
+    explore_random = LaneRandom(explore_seed, num_envs, shape=2)
+    # reward and length of the episode every lane is playing
+    lane_reward = np.zeros(num_envs)
+    lane_steps = np.zeros(num_envs, dtype=np.int64)
+
+    # episode (of its config) played by every lane, lanes past total_episodes sit idle
+    lane_episode = lanes % lanes_per_config
+    next_episode = np.full(n_configs, lanes_per_config)
+
+    # random maps are generated in large batches and handed out as lanes finish
+    map_pool = np.empty((0, env.nrow, env.ncol), dtype=np.uint8)
+
+    def new_maps(episodes):
+        nonlocal map_pool
+        if map_bank is not None:
+            return map_bank[episodes % len(map_bank)]
+        if len(map_pool) < len(episodes):
+            batch = max(MAP_POOL_SIZE, len(episodes))
+            map_pool = np.concatenate(
+                [map_pool, generate_random_maps(batch, env.nrow, frozen_p, seed=maps_rng)]
+            )
+        maps, map_pool = map_pool[:len(episodes)], map_pool[len(episodes):]
+        return maps
+
+    def save():
+        save_checkpoint(
+            checkpoint, qtables=qtables, total_episodes=total_episodes, maps_rng=maps_rng.bit_generator.state,
+            explore_random=explore_random.state_dict(),
+            env=env.state_dict(), lane_episode=lane_episode, next_episode=next_episode,
+            lane_epsilon=lane_epsilon, lane_reward=lane_reward, lane_steps=lane_steps,
+            map_pool=map_pool, metrics=metrics.state_dict(),
+        )
+
+    if checkpoint is not None and Path(checkpoint).exists():
+        saved = load_checkpoint(checkpoint)
+        if saved["qtables"].shape != qtables.shape or saved["total_episodes"] != total_episodes \
+                or len(saved["lane_episode"]) != num_envs:
+            raise ValueError(f"{checkpoint} was written by a run with different qtables, num_envs or total_episodes")
+        qtables[...] = saved["qtables"]
+        maps_rng.bit_generator.state = saved["maps_rng"]
+        explore_random.load_state_dict(saved["explore_random"])
+        env.load_state_dict(saved["env"])
+        lane_episode, next_episode, lane_epsilon = saved["lane_episode"], saved["next_episode"], saved["lane_epsilon"]
+        lane_reward, lane_steps, map_pool = saved["lane_reward"], saved["lane_steps"], saved["map_pool"]
+        metrics.load_state_dict(saved["metrics"])
+        obs = env.observe()
+    else:
+        if map_bank is not None or frozen_p is not None:
+            env.set_maps(lanes, new_maps(lane_episode))
+        obs = env.reset(seed=None if seed is None else env_seed)
+        lane_epsilon = epsilon_schedule(lane_episode, epsilon, max_epsilon, min_epsilon, decay_rate)
+    # row of q of every lane: its config's block, then its observation
+    n_obs = int(np.prod(obs_shape))
+    row_offset = config * n_obs
+    state = row_offset + _as_row(obs, obs_shape)
+    active = lane_episode < total_episodes
+    next_save = time.monotonic() + checkpoint_every
+    phase = null_phase if profiler is None else profiler.phase
+
+    # one row of action values per (config, observation)
+    q = qtables.reshape(-1, nA)
+    while active.any():
+        with phase("select_action"):
+            # exploit if a uniform draw is greater than epsilon, else explore
+            greedy = np.argmax(q, axis=1)[state]
+            draws = explore_random.random()
+            explore = draws[:, 0] <= lane_epsilon
+            action = np.where(explore, (draws[:, 1] * nA).astype(np.int64), greedy)
+
+        with phase("env.step"):
+            obs, reward, done, info = env.step(action)
+            new_state = row_offset + _as_row(obs, obs_shape)
+            # bootstrap from the state the lane actually reached, before any auto-reset
+            if "terminal_observation" in info:
+                reached = row_offset + _as_row(info["terminal_observation"], obs_shape)
+            else:
+                reached = new_state
+
+        with phase("q_update"):
+            a = active
+            target = reward[a] + gamma[a] * np.max(q, axis=1)[reached[a]]
+            # Q(s,a) += lr * (target - Q(s,a)), averaging the TD errors of lanes that hit the same entry
+            flat = state[a] * nA + action[a]
+            delta = target - q.reshape(-1)[flat]
+            counts = np.bincount(flat, minlength=q.size)
+            sums = np.bincount(flat, weights=learning_rate[a] * delta, minlength=q.size)
+            hit = counts > 0
+            q.reshape(-1)[hit] += sums[hit] / counts[hit]
+
+        lane_reward[a] += reward[a]
+        lane_steps[a] += 1
+
+        finished = done & active
+        if profiler is not None:
+            profiler.count("lane_steps", int(a.sum()))
+            profiler.count("episodes", int(finished.sum()))
+        if finished.any():
+            with phase("episode_end"):
+                done_lanes = lanes[finished]
+                metrics.add(lane_episode[done_lanes], lane_reward[done_lanes], lane_steps[done_lanes],
+                            reward[done_lanes] > 0, config[done_lanes])
+                lane_reward[done_lanes] = 0
+                lane_steps[done_lanes] = 0
+                # finished lanes start the next episodes of their config, in lane order
+                done_config = config[done_lanes]
+                n_done = np.bincount(done_config, minlength=n_configs)
+                rank = np.arange(len(done_lanes)) - (np.cumsum(n_done) - n_done)[done_config]
+                lane_episode[done_lanes] = next_episode[done_config] + rank
+                next_episode += n_done
+                lane_epsilon[done_lanes] = epsilon_schedule(
+                    lane_episode[done_lanes], epsilon[done_lanes], max_epsilon[done_lanes],
+                    min_epsilon[done_lanes], decay_rate[done_lanes]
+                )
+                active = lane_episode < total_episodes
+                restart = done_lanes[active[done_lanes]]
+                if restart.size and (map_bank is not None or frozen_p is not None):
+                    env.set_maps(restart, new_maps(lane_episode[restart]))
+                    new_state = row_offset + _as_row(env.observe(), obs_shape)
+        state = new_state
+
+        if checkpoint is not None and time.monotonic() >= next_save:
+            save()
+            next_save = time.monotonic() + checkpoint_every
+
+    if checkpoint is not None:
+        save()
+    metrics.close()
+    rewards_1000 = metrics.totals("reward") if metrics.keep_history else None
+    return qtables, rewards_1000
@@ -0,0 +1,32 @@
+"""Regression tests for custom_frozen_lake.metrics, run from Task_6 with
+
+    python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from custom_frozen_lake.metrics import EpisodeMetrics
+
+
+class EpisodeMetricsTest(unittest.TestCase):
+    def test_batch_wider_than_ring(self):
+        # windows 0 and 4 share slot 0 of a 4-slot ring, and both are new in one batch
+        metrics = EpisodeMetrics(1000, 1, 5000)
+        metrics.add([0, 4000], [1.0, 2.0], [3, 4], [True, False])
+        metrics.close()
+        self.assertEqual(sorted(zip(metrics.history["window"], metrics.history["episodes"])), [(0, 1), (4, 1)])
+
+    def test_every_window_complete_out_of_order(self):
+        rng = np.random.default_rng(0)
+        episodes = rng.permutation(20000)
+        metrics = EpisodeMetrics(1000, 2, 10000)
+        # wide batches finishing across many windows at once, as train_q_learning with many lanes
+        for batch in np.array_split(episodes, 5):
+            metrics.add(batch % 10000, np.ones(len(batch)), 1, True, batch // 10000)
+        self.assertEqual(sorted(metrics.history["episodes"]), [1000] * 20)
+        np.testing.assert_array_equal(metrics.totals("reward"), np.full((2, 10), 1000.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Regression tests for custom_frozen_lake.planning, run from Task_6 with
+
+    python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from custom_frozen_lake.envs import FrozenLakeEnv, build_sparse_model, generate_random_maps
+from custom_frozen_lake.envs.custom_frozen_lake_env import build_transition_model
+from custom_frozen_lake.planning import (
+    policy_iteration,
+    sparse_policy_iteration,
+    sparse_value_iteration,
+    value_iteration,
+)
+
+GAMMA = 0.95
+
+
+def p_dict_value_iteration(P, n_states, n_actions, gamma, tol=1e-12):
+    """Textbook value iteration over gym's P[s][a] = [(prob, next_state, reward, done), ...]"""
+    values = np.zeros(n_states)
+    while True:
+        q = np.array([[sum(p * (r + gamma * (0.0 if d else values[s2])) for p, s2, r, d in P[s][a])
+                       for a in range(n_actions)] for s in range(n_states)])
+        new = q.max(axis=1)
+        if np.abs(new - values).max() <= tol:
+            return new
+        values = new
+
+
+class SolverAgreementTest(unittest.TestCase):
+    def test_dense_solvers_match_p_dict(self):
+        env = FrozenLakeEnv(map_name="8x8")
+        expected = p_dict_value_iteration(env.P, env.nrow * env.ncol, 4, GAMMA)
+        vi = value_iteration(env.transitions, GAMMA, tol=1e-12)
+        pi = policy_iteration(env.transitions, GAMMA)
+        self.assertTrue(vi.converged and pi.converged)
+        np.testing.assert_allclose(vi.values, expected, atol=1e-7)
+        np.testing.assert_allclose(pi.values, expected, atol=1e-7)
+
+    def test_sparse_solvers_match_dense(self):
+        for is_slippery in (True, False):
+            desc = generate_random_maps(1, 12, 0.7, seed=5)[0]
+            dense = value_iteration(build_transition_model(desc, is_slippery), GAMMA, tol=1e-12)
+            model = build_sparse_model(desc, is_slippery)
+            vi = sparse_value_iteration(model, GAMMA, tol=1e-12)
+            pi = sparse_policy_iteration(model, GAMMA)
+            self.assertTrue(vi.converged and pi.converged)
+            np.testing.assert_allclose(vi.values, dense.values, atol=1e-7)
+            np.testing.assert_allclose(vi.q, dense.q, atol=1e-7)
+            np.testing.assert_allclose(pi.values, dense.values, atol=1e-7)
+
+    def test_batch_matches_single_maps(self):
+        descs = generate_random_maps(6, 8, 0.75, seed=0)
+        batch = value_iteration(build_transition_model(descs, True), GAMMA, tol=1e-12)
+        self.assertTrue(batch.converged.all())
+        np.testing.assert_allclose(policy_iteration(build_transition_model(descs, True), GAMMA).values,
+                                   batch.values, atol=1e-7)
+        for i in (0, 5):
+            single = value_iteration(build_transition_model(descs[i], True), GAMMA, tol=1e-12)
+            np.testing.assert_allclose(single.values, batch.values[i], atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
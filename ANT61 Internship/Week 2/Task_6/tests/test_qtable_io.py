@@ -0,0 +1,49 @@
+"""Regression tests for custom_frozen_lake.qtable_io, run from Task_6 with
+
+    python -m unittest discover tests
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from custom_frozen_lake.qtable_io import load_qtable, save_qtable
+
+
+class QTableIOTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._dir.name)
+        self.qtable = np.random.default_rng(0).random((16, 4, 4))
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_round_trip(self):
+        path = save_qtable(self.dir / "qtable.npy", self.qtable)
+        self.assertEqual(path, self.dir / "qtable.npy")
+        loaded = load_qtable(path)
+        self.assertIsInstance(loaded, np.memmap)
+        self.assertFalse(loaded.flags.writeable)
+        np.testing.assert_array_equal(loaded, self.qtable)
+        np.testing.assert_array_equal(load_qtable(path, mmap=False), self.qtable)
+
+    def test_dotted_name(self):
+        # the hyperparameters in train_model's file names must not be taken for a suffix
+        name = "1500000_0.0_1.0_0.0001_0.1"
+        path = save_qtable(self.dir / name, self.qtable)
+        self.assertEqual(path.name, name + ".npy")
+        np.testing.assert_array_equal(load_qtable(self.dir / name), self.qtable)
+        np.testing.assert_array_equal(load_qtable(path), self.qtable)
+
+    def test_text_table_converted(self):
+        table = self.qtable.reshape(16, -1)
+        text = self.dir / "0.9_0.1.csv"
+        np.savetxt(text, table, delimiter=",")
+        np.testing.assert_array_equal(load_qtable(text), table)
+        self.assertTrue((self.dir / "0.9_0.1.npy").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Regression tests for custom_frozen_lake.envs.vector_frozen_lake_env, run from Task_6 with
+
+    python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from custom_frozen_lake.envs import VectorFrozenLakeEnv
+from custom_frozen_lake.envs.map_generation import TILE_G, TILE_H
+
+
+class AutoResetTest(unittest.TestCase):
+    def test_finished_lanes_restart(self):
+        env = VectorFrozenLakeEnv(num_envs=64, map_size=8, observation="position", max_episode_steps=20, seed=0)
+        env.reset(seed=0)
+        rng = np.random.default_rng(0)
+        finished = 0
+        for _ in range(100):
+            actions = rng.integers(4, size=env.num_envs)
+            sent = actions.copy()
+            obs, rewards, dones, info = env.step(actions)
+            np.testing.assert_array_equal(actions, sent)
+            if not dones.any():
+                continue
+            finished += dones.sum()
+            # episodes that ended on their own did so on a hole or the goal, and the lanes restart
+            ended = dones & ~info["TimeLimit.truncated"]
+            last = env.descs.reshape(env.num_envs, -1)[np.arange(env.num_envs), info["terminal_observation"]]
+            self.assertTrue(np.isin(last[ended], (TILE_G, TILE_H)).all())
+            np.testing.assert_array_equal(obs[dones], env.start[dones])
+            np.testing.assert_array_equal(env.elapsed_steps[dones], 0)
+            np.testing.assert_array_equal(env.lastaction[dones], -1)
+            np.testing.assert_array_equal(env.lastaction[~dones], actions[~dones])
+        self.assertGreater(finished, 0)
+
+    def test_without_auto_reset_done_lanes_stay(self):
+        env = VectorFrozenLakeEnv(num_envs=32, map_size=8, observation="position", auto_reset=False, seed=1)
+        env.reset(seed=1)
+        rng = np.random.default_rng(1)
+        done = np.zeros(env.num_envs, dtype=bool)
+        for _ in range(200):
+            before = env.s.copy()
+            obs, rewards, dones, info = env.step(rng.integers(4, size=env.num_envs))
+            np.testing.assert_array_equal(obs[done], before[done])
+            np.testing.assert_array_equal(rewards[done], 0.0)
+            self.assertTrue(dones[done].all())
+            self.assertNotIn("terminal_observation", info)
+            done |= dones
+        self.assertTrue(done.any())
+
+
+if __name__ == "__main__":
+    unittest.main()
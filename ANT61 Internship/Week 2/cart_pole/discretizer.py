@@ -0,0 +1,85 @@
+"""Observation discretization for tabular Q-learning on CartPole.
+
+A Discretizer holds the bin edges of every observation dimension and maps a
+batch of observations to flat state indices in one call, so the Q-table is a
+2-D (n_states, n_actions) array indexed with a single integer:
+
+    discretizer = Discretizer.uniform(low, high, bins=20)
+    q_table = np.zeros((discretizer.n_states, env.action_space.n))
+    state = discretizer(env.reset())             # int index
+    states = discretizer(observations)           # (N, 4) -> (N,) indices
+
+Values outside the edges are clipped into the first and last bins. Edges can be
+given per dimension (non-uniform, e.g. finer around an upright pole), or placed
+at quantiles of observed states with `from_samples` so every bin is visited
+about equally often.
+"""
+from typing import Sequence, Union
+
+import numpy as np
+
+Bins = Union[int, Sequence[int]]
+
+# observation values from which a binary search per dimension beats comparing
+# against every edge at once
+BATCH_SEARCH = 256
+
+
+class Discretizer:
+    """Maps observations to flat bin indices
+    :param edges: per dimension, the increasing inner edges between its bins, so
+        a dimension with k edges has k + 1 bins; bin i holds edges[i-1] <= x < edges[i]
+    """
+
+    def __init__(self, edges: Sequence[Sequence[float]]):
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        for e in self.edges:
+            if e.ndim != 1 or np.any(np.diff(e) < 0):
+                raise ValueError("edges of every dimension must be a 1-D increasing sequence")
+        self.shape = tuple(len(e) + 1 for e in self.edges)
+        self.n_states = int(np.prod(self.shape))
+        # (dims, max edges) padded with nan, which no observation compares >= to
+        self._edges = np.full((len(self.edges), max(self.shape) - 1), np.nan)
+        for row, e in zip(self._edges, self.edges):
+            row[:len(e)] = e
+        self._strides = np.array([int(np.prod(self.shape[i + 1:])) for i in range(len(self.shape))], dtype=np.int64)
+
+    @classmethod
+    def uniform(cls, low, high, bins: Bins = 20) -> "Discretizer":
+        """`bins` equal-width bins over [low, high] per dimension"""
+        low, high = np.broadcast_arrays(np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64))
+        bins = np.broadcast_to(bins, low.shape)
+        return cls([np.linspace(l, h, b + 1)[1:-1] for l, h, b in zip(low, high, bins)])
+
+    @classmethod
+    def from_samples(cls, samples, bins: Bins = 20) -> "Discretizer":
+        """Adaptive bins at the quantiles of samples, (N, dims) observations, so each
+        bin holds about the same share of them; repeated quantiles leave empty bins
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        bins = np.broadcast_to(bins, samples.shape[1:])
+        return cls([np.quantile(column, np.linspace(0, 1, b + 1)[1:-1]) for column, b in zip(samples.T, bins)])
+
+    def bins(self, obs) -> np.ndarray:
+        """Bin of every dimension, (..., dims) observations to (..., dims) ints"""
+        obs = np.asarray(obs, dtype=np.float64)
+        if obs.size < BATCH_SEARCH:
+            return np.count_nonzero(obs[..., None] >= self._edges, axis=-1)
+        bins = np.empty(obs.shape, dtype=np.int64)
+        for i, e in enumerate(self.edges):
+            bins[..., i] = np.searchsorted(e, obs[..., i], side="right")
+        return bins
+
+    def __call__(self, obs):
+        """Flat state index, (..., dims) observations to (...) ints"""
+        obs = np.asarray(obs, dtype=np.float64)
+        if obs.size < BATCH_SEARCH:
+            return np.count_nonzero(obs[..., None] >= self._edges, axis=-1) @ self._strides
+        states = np.zeros(obs.shape[:-1], dtype=np.int64)
+        for i, e in enumerate(self.edges):
+            states += np.searchsorted(e, np.ascontiguousarray(obs[..., i]), side="right") * self._strides[i]
+        return states
+
+    def unravel(self, states) -> tuple:
+        """Per dimension bins of flat state indices"""
+        return np.unravel_index(states, self.shape)
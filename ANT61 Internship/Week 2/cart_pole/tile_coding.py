@@ -0,0 +1,100 @@
+"""Tile coding of CartPole observations, a linear action-value approximator.
+
+A TileCoder lays `num_tilings` grids of `tiles` tiles per dimension over the
+observation bounds, each shifted by a fraction of a tile, and maps an
+observation to the tile it falls in on every grid. Together the tilings
+resolve `tiles * num_tilings` steps per dimension while each update
+generalizes to the neighbouring states sharing its tiles. The tiles of all
+tilings are hashed into `size` weights, so memory does not grow with the
+number of tiles:
+
+    coder = TileCoder(low=[-2.4, -3, -0.21, -3.5], high=[2.4, 3, 0.21, 3.5], tiles=8, num_tilings=8)
+    q = TileCodingQ(coder, n_actions=2)               # (4096, 2) weights
+    features = coder(obs)                             # (N, 4) -> (N, 8) weight rows
+    values = q.values(features)                       # (N, 2)
+    q.update(features, actions, td_errors, learning_rate=0.1)
+
+Observations outside the bounds are clipped into the edge tiles.
+"""
+import numpy as np
+
+# 2^64 / golden ratio, multiplicative (Fibonacci) hashing of tile indices
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class TileCoder:
+    """Maps observations to the weight index of their tile in every tiling
+    :param low, high: per dimension bounds the tiles cover
+    :param tiles: tiles per dimension of every tiling, an int or one per dimension
+    :param num_tilings: number of offset tilings, the number of active features
+    :param size: number of weights the tiles are hashed into, a power of two; None
+        for one weight per tile without hashing
+    """
+
+    def __init__(self, low, high, tiles=8, num_tilings: int = 8, size=4096):
+        low, high = np.broadcast_arrays(np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64))
+        self.low = low
+        self.num_tilings = num_tilings
+        self.tiles = np.broadcast_to(np.asarray(tiles, dtype=np.int64), low.shape).copy()
+        self.tile_width = (high - low) / self.tiles
+        # tiling k is shifted by k * (1, 3, 5, 7, ...) / num_tilings of a tile, Sutton & Barto's
+        # asymmetric offsets, which avoid the diagonal artefacts of equal shifts
+        displacement = 2 * np.arange(len(low)) + 1
+        self._offsets = (np.arange(num_tilings)[:, None] * displacement / num_tilings) % 1
+        # every tiling needs one extra tile per dimension to cover its shift
+        shape = self.tiles + 1
+        self._max_tile = self.tiles
+        self._strides = np.array([int(np.prod(shape[i + 1:])) for i in range(len(shape))], dtype=np.int64)
+        tiles_per_tiling = int(np.prod(shape))
+        self._tiling_base = np.arange(num_tilings, dtype=np.int64) * tiles_per_tiling
+        if size is None:
+            self.size = num_tilings * tiles_per_tiling
+            self._shift = None
+        else:
+            if size < 2 or size & (size - 1):
+                raise ValueError(f"size must be a power of two, got {size}")
+            self.size = size
+            self._shift = np.uint64(64 - (size.bit_length() - 1))
+
+    def __call__(self, obs) -> np.ndarray:
+        """Active weight of every tiling, (..., dims) observations to (..., num_tilings) ints"""
+        scaled = (np.asarray(obs, dtype=np.float64) - self.low) / self.tile_width
+        tile = np.floor(scaled[..., None, :] + self._offsets).astype(np.int64)
+        np.clip(tile, 0, self._max_tile, out=tile)
+        index = tile @ self._strides + self._tiling_base
+        if self._shift is None:
+            return index
+        return ((index.astype(np.uint64) * _HASH_MULTIPLIER) >> self._shift).astype(np.int64)
+
+
+class TileCodingQ:
+    """Linear action values over a TileCoder's features, Q(s, a) is the sum of
+    the weights of the active tiles of s for a
+    :param coder: TileCoder of the observations
+    :param n_actions: size of the action space
+    """
+
+    def __init__(self, coder: TileCoder, n_actions: int):
+        self.coder = coder
+        self.weights = np.zeros((coder.size, n_actions))
+
+    def values(self, features) -> np.ndarray:
+        """(..., n_actions) action values of (..., num_tilings) features"""
+        return self.weights[features].sum(axis=-2)
+
+    def __call__(self, obs) -> np.ndarray:
+        """(..., n_actions) action values of (..., dims) observations"""
+        return self.values(self.coder(obs))
+
+    def update(self, features, actions, td_errors, learning_rate: float):
+        """Moves the values of (features, actions) by learning_rate * td_errors, split
+        evenly over the tilings; a weight hit by several samples takes their mean step
+        :param features: (N, num_tilings) from the coder
+        :param actions, td_errors: (N,) arrays
+        """
+        n_actions = self.weights.shape[1]
+        flat = (features * n_actions + np.asarray(actions)[:, None]).reshape(-1)
+        steps = np.repeat(learning_rate / self.coder.num_tilings * np.asarray(td_errors), features.shape[1])
+        hit, which = np.unique(flat, return_inverse=True)
+        # indexed by (row, action), so the update lands in weights whatever its memory layout
+        self.weights[hit // n_actions, hit % n_actions] += np.bincount(which, weights=steps) / np.bincount(which)
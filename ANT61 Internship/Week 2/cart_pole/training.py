@@ -0,0 +1,119 @@
+"""Batched epsilon-greedy Q-learning of CartPole.
+
+`train_q_learning` plays `env.num_envs` episodes at a time on a
+VectorCartPoleEnv, with the action choice, env step and Q update of every lane
+done as one array operation, on the flat (n_states, n_actions) q_table of
+cart_pole.ipynb:
+
+    discretizer = Discretizer.uniform(low, high, bins=20)
+    q_table = np.zeros((discretizer.n_states, 2))
+    env = VectorCartPoleEnv(num_envs=1024, seed=0)
+    q_table, ep_rewards = train_q_learning(env, discretizer, q_table, total_episodes=200_000)
+
+`train_tile_coding` runs the same loop on a cart_pole.tile_coding.TileCodingQ:
+
+    q = TileCodingQ(TileCoder(low, high, tiles=8, num_tilings=8), n_actions=2)
+    q, ep_rewards = train_tile_coding(env, q, total_episodes=20000)
+"""
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def train_q_learning(env, discretizer, q_table: np.ndarray, total_episodes: int = 20000,
+                     learning_rate: float = 0.1, gamma: float = 0.6, epsilon: float = 1,
+                     max_epsilon: float = 1, min_epsilon: float = 0.0001, decay_rate: float = 0.00005,
+                     seed: Optional[int] = None):
+    """Trains `q_table` in place and returns `(q_table, ep_rewards)`, the total reward of
+    every episode in the order they finished
+    :param env: VectorCartPoleEnv with auto_reset, its lanes play episodes in parallel
+    :param discretizer: cart_pole.discretizer.Discretizer mapping observations to q_table rows
+    :param q_table: (discretizer.n_states, n_actions) action values
+    :param seed: int or SeedSequence of the exploration draws
+    The remaining parameters are those of train_model. Epsilon decays with the
+    index of the episode a lane plays. Failing states bootstrap from 0, truncated
+    ones from their action values. Lanes updating the same entry in a step have
+    their TD errors averaged.
+    """
+    n_actions = q_table.shape[1]
+
+    def update(state, action, delta):
+        flat = state * n_actions + action
+        # over the entries hit this step rather than all of q_table, which is mostly unvisited
+        hit, which = np.unique(flat, return_inverse=True)
+        # indexed by (row, action), so the update lands in q_table whatever its memory layout
+        step = np.bincount(which, weights=learning_rate * delta) / np.bincount(which)
+        q_table[hit // n_actions, hit % n_actions] += step
+
+    ep_rewards = _q_learning(env, discretizer, q_table.__getitem__, update, n_actions, total_episodes, gamma,
+                             epsilon, max_epsilon, min_epsilon, decay_rate, seed)
+    return q_table, ep_rewards
+
+
+def train_tile_coding(env, q, total_episodes: int = 20000, learning_rate: float = 0.1, gamma: float = 0.99,
+                      epsilon: float = 1, max_epsilon: float = 1, min_epsilon: float = 0.0001,
+                      decay_rate: float = 0.00005, seed: Optional[int] = None):
+    """Trains the weights of `q` in place and returns `(q, ep_rewards)`, like train_q_learning
+    :param q: cart_pole.tile_coding.TileCodingQ
+    :param learning_rate: step size of a whole TD error, split over the tilings
+    """
+    def update(features, action, delta):
+        q.update(features, action, delta, learning_rate)
+
+    ep_rewards = _q_learning(env, q.coder, q.values, update, q.weights.shape[1], total_episodes, gamma,
+                             epsilon, max_epsilon, min_epsilon, decay_rate, seed)
+    return q, ep_rewards
+
+
+def _q_learning(env, encode: Callable, values: Callable, update: Callable, n_actions: int, total_episodes: int,
+                gamma: float, epsilon: float, max_epsilon: float, min_epsilon: float, decay_rate: float,
+                seed) -> np.ndarray:
+    """Batched loop of the trainers
+    :param encode: observations to the states (or features) values and update take
+    :param values: states to (N, n_actions) action values
+    :param update: update(states, actions, td_errors) of the learned action values
+    """
+    num_envs = env.num_envs
+    rng = np.random.default_rng(seed)
+    lanes = np.arange(num_envs)
+
+    lane_episode = lanes.copy()
+    next_episode = num_envs
+    lane_epsilon = np.where(lane_episode == 0, epsilon,
+                            min_epsilon + (max_epsilon - min_epsilon) * np.exp(-decay_rate * (lane_episode - 1)))
+    lane_reward = np.zeros(num_envs)
+    ep_rewards = []
+
+    state = encode(env.reset())
+    active = lane_episode < total_episodes
+    while active.any():
+        # exploit if a uniform draw is greater than epsilon, else explore
+        current = values(state)
+        greedy = np.argmax(current, axis=1)
+        explore = rng.random(num_envs) <= lane_epsilon
+        action = np.where(explore, rng.integers(n_actions, size=num_envs), greedy)
+
+        obs, reward, done, info = env.step(action)
+        new_state = encode(obs)
+        # bootstrap from the state the lane actually reached, before any auto-reset
+        reached = encode(info["terminal_observation"]) if "terminal_observation" in info else new_state
+        failed = done & ~info["TimeLimit.truncated"] if "TimeLimit.truncated" in info else done
+
+        a = active
+        target = reward[a] + gamma * np.where(failed[a], 0.0, np.max(values(reached[a]), axis=1))
+        update(state[a], action[a], target - current[lanes[a], action[a]])
+
+        lane_reward[a] += reward[a]
+        finished = done & active
+        if finished.any():
+            done_lanes = lanes[finished]
+            ep_rewards.extend(lane_reward[done_lanes])
+            lane_reward[done_lanes] = 0
+            lane_episode[done_lanes] = next_episode + np.arange(len(done_lanes))
+            next_episode += len(done_lanes)
+            lane_epsilon[done_lanes] = min_epsilon + (max_epsilon - min_epsilon) * np.exp(
+                -decay_rate * (lane_episode[done_lanes] - 1))
+            active = lane_episode < total_episodes
+        state = new_state
+
+    return np.array(ep_rewards)
@@ -0,0 +1,168 @@
+"""Batched CartPole-v1 dynamics in NumPy.
+
+VectorCartPoleEnv advances `num_envs` carts with one call, using the physics
+constants, Euler integration, termination thresholds and 500 step limit of
+gym's CartPole-v1, and resets finished carts in the same call:
+
+    env = VectorCartPoleEnv(num_envs=1024, seed=0)
+    obs = env.reset()                                   # (1024, 4)
+    obs, rewards, dones, info = env.step(actions)       # actions: (1024,) of 0/1
+    states = discretizer(obs)                           # cart_pole.discretizer
+
+The state is held as one contiguous row per variable, so every step is a few
+array operations over all carts.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+from gym import spaces
+
+GRAVITY = 9.8
+MASSCART = 1.0
+MASSPOLE = 0.1
+TOTAL_MASS = MASSPOLE + MASSCART
+LENGTH = 0.5  # actually half the pole's length
+POLEMASS_LENGTH = MASSPOLE * LENGTH
+FORCE_MAG = 10.0
+TAU = 0.02  # seconds between state updates
+
+# Angle and position at which to fail the episode
+THETA_THRESHOLD_RADIANS = 12 * 2 * math.pi / 360
+X_THRESHOLD = 2.4
+
+# CartPole-v1 is registered with max_episode_steps=500
+MAX_EPISODE_STEPS = 500
+
+
+class VectorCartPoleEnv:
+    """
+    Batched version of gym's CartPoleEnv (CartPole-v1) that advances `num_envs`
+    carts with a single call.
+    ### Arguments
+    ```
+    VectorCartPoleEnv(num_envs=1024, max_episode_steps=500, auto_reset=True, seed=None)
+    ```
+    `max_episode_steps`: lanes are truncated after this many steps, None for no limit.
+    `auto_reset`: if True, lanes that finish are reset in the same `step` call and
+        the observation of the finished episode is returned in
+        `info["terminal_observation"]`. Otherwise lanes that are done keep their
+        state and get reward 0 until `reset`.
+    `seed`: int or SeedSequence of the initial states.
+    ### Step
+    `step(actions)` takes an int array of shape (num_envs,), 0 to push the cart
+    left and 1 to push it right, and returns `(obs, rewards, dones, info)` where
+    every entry is an array over lanes. As in CartPole-v1 every step, the last
+    one included, has reward 1. `info["TimeLimit.truncated"]` marks lanes that
+    hit the step limit rather than failing.
+    The (num_envs, 4) observation is float64 (gym returns the same values cast
+    to float32) and a view of the state, which is rebuilt on every step.
+    """
+
+    def __init__(
+        self,
+        num_envs: int = 1024,
+        max_episode_steps: Optional[int] = MAX_EPISODE_STEPS,
+        auto_reset: bool = True,
+        seed=None,
+    ):
+        self.num_envs = num_envs
+        self.max_episode_steps = max_episode_steps
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+
+        high = np.array(
+            [X_THRESHOLD * 2, np.finfo(np.float32).max, THETA_THRESHOLD_RADIANS * 2, np.finfo(np.float32).max],
+            dtype=np.float32,
+        )
+        self.single_observation_space = spaces.Box(-high, high, dtype=np.float32)
+        self.single_action_space = spaces.Discrete(2)
+
+        self._lanes = np.arange(num_envs)
+        # (4, num_envs): x, x_dot, theta, theta_dot
+        self.state = np.zeros((4, num_envs))
+        self.elapsed_steps = np.zeros(num_envs, dtype=np.int64)
+        self.done = np.zeros(num_envs, dtype=bool)
+
+    def _initial_states(self, n: int) -> np.ndarray:
+        return self.rng.uniform(low=-0.05, high=0.05, size=(4, n))
+
+    def reset(self, *, seed=None, return_info: bool = False, options: Optional[dict] = None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.state = self._initial_states(self.num_envs)
+        self.elapsed_steps[:] = 0
+        self.done[:] = False
+        obs = self.state.T
+        if not return_info:
+            return obs
+        return obs, {}
+
+    def step(self, actions: np.ndarray):
+        x, x_dot, theta, theta_dot = self.state
+        force = np.where(np.asarray(actions) == 1, FORCE_MAG, -FORCE_MAG)
+        costheta = np.cos(theta)
+        sintheta = np.sin(theta)
+
+        # For the interested reader:
+        # https://coneural.org/florian/papers/05_cart_pole.pdf
+        temp = (force + POLEMASS_LENGTH * theta_dot**2 * sintheta) / TOTAL_MASS
+        thetaacc = (GRAVITY * sintheta - costheta * temp) / (
+            LENGTH * (4.0 / 3.0 - MASSPOLE * costheta**2 / TOTAL_MASS)
+        )
+        xacc = temp - POLEMASS_LENGTH * thetaacc * costheta / TOTAL_MASS
+
+        # euler, as CartPole-v1's default kinematics_integrator
+        state = np.empty_like(self.state)
+        np.add(x, TAU * x_dot, out=state[0])
+        np.add(x_dot, TAU * xacc, out=state[1])
+        np.add(theta, TAU * theta_dot, out=state[2])
+        np.add(theta_dot, TAU * thetaacc, out=state[3])
+
+        failed = (np.abs(state[0]) > X_THRESHOLD) | (np.abs(state[2]) > THETA_THRESHOLD_RADIANS)
+        if self.auto_reset:
+            rewards = np.ones(self.num_envs)
+            dones = failed
+        else:
+            # lanes that were already done stay put
+            state = np.where(self.done, self.state, state)
+            rewards = np.where(self.done, 0.0, 1.0)
+            dones = failed | self.done
+        self.state = state
+        self.elapsed_steps += 1
+
+        info = {}
+        if self.max_episode_steps is not None:
+            truncated = (self.elapsed_steps >= self.max_episode_steps) & ~dones
+            info["TimeLimit.truncated"] = truncated
+            dones = dones | truncated
+
+        obs = state.T
+        if not self.auto_reset:
+            self.done = dones
+        elif dones.any():
+            info["terminal_observation"] = obs.copy()
+            lanes = self._lanes[dones]
+            state[:, lanes] = self._initial_states(len(lanes))
+            self.elapsed_steps[lanes] = 0
+        return obs, rewards, dones, info
+
+    def state_dict(self) -> dict:
+        """States, step counters and RNG state of every lane, for checkpoints"""
+        return {
+            "state": self.state.copy(),
+            "elapsed_steps": self.elapsed_steps.copy(),
+            "done": self.done.copy(),
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def load_state_dict(self, state: dict):
+        """Restores a state_dict of an env with the same num_envs"""
+        self.state = np.array(state["state"], dtype=np.float64)
+        self.elapsed_steps = np.array(state["elapsed_steps"], dtype=np.int64)
+        self.done = np.array(state["done"], dtype=bool)
+        self.rng.bit_generator.state = state["rng"]
+
+    def close(self):
+        pass